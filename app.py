@@ -1,17 +1,61 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, g, Response
+import json
 import logging
-from scraper import build_website_map, scrape_contact_info_fallback
-from nlp import extract_keywords_and_intent, scrape_targeted_content
-from database import init_db, get_contact_info, store_contact_info
-from thefuzz import fuzz, process
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from scraper import scrape_contact_info_fallback, is_contact_info, get_fetch_stats, FETCH_MODE
+from driver_pool import get_driver_pool, get_pool_stats
+from page_cache import get_cache_stats
+from prefetch import prefetcher, get_prefetch_stats
+from nlp import (extract_keywords_and_intent, follow_up_url, get_targeted_content, get_targeted_snippets, iter_snippet_chunks, format_snippets,
+                 mentions_contact, get_nlp_stats, format_search_results, FETCH_FAILED_MESSAGE)
+from database import init_db, get_contact_info, store_contact_info, search_content, get_ingested_urls
+from routing import get_routing_index
+from matcher import candidate_phrases
+from sessions import create_session_store, Session, PendingSessions
+from metrics import REGISTRY, REQUEST_SECONDS, CHAT_REPLIES, stage, render_metrics
 
 app = Flask(__name__)
 
 logging.basicConfig(level=logging.DEBUG)
 
-# Global variables
-website_map = {}
-user_sessions = {}
+# Make sure the pre-extracted content tables exist in every worker process
+init_db()
+
+# Conversational context per session_id, shared across worker processes
+user_sessions = create_session_store()
+
+# Export the /stats counters as gauges on /metrics too
+REGISTRY.register_collector('chatbot_driver_pool', get_pool_stats)
+REGISTRY.register_collector('chatbot_page_cache', get_cache_stats)
+REGISTRY.register_collector('chatbot_fetch', get_fetch_stats)
+REGISTRY.register_collector('chatbot_prefetch', get_prefetch_stats)
+REGISTRY.register_collector('chatbot_nlp', get_nlp_stats)
+REGISTRY.register_collector('chatbot_sessions', lambda: user_sessions.stats())
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    labels = {'endpoint': request.endpoint or 'unknown', 'status': response.status_code}
+    if response.is_streamed:
+        # A streamed body is generated after this hook returns; time the request
+        # until the server has sent all of it and closes the response
+        response.call_on_close(lambda: REQUEST_SECONDS.observe(time.perf_counter() - started, **labels))
+    else:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, **labels)
+    return response
+
+def urls_to_prefetch(routing):
+    """Return the section URLs worth warming: ingested pages are answered from SQLite."""
+    ingested = get_ingested_urls()
+    return [url for url in routing.urls if url not in ingested]
 
 @app.route('/')
 def index():
@@ -20,149 +64,336 @@ def index():
 @app.route('/welcome', methods=['GET'])
 def welcome():
     """Return welcome message and navigation items (structure only, no scraping)."""
-    global website_map
-    website_map = build_website_map()
-    if not website_map:
+    routing = get_routing_index()
+    if not routing.nav_items:
         logging.error("Failed to build website map.")
         return jsonify({'message': 'Sorry, I couldn’t load the website sections.', 'nav_items': []})
 
-    nav_items = [
-        {
-            'title': title.capitalize(),
-            'url': data['url'],
-            'subcategories': [
-                {'title': sub_title.capitalize(), 'url': sub_data['url']}
-                for sub_title, sub_data in data['subcategories'].items()
-            ] if title.lower() == 'practice areas' else []
-        }
-        for title, data in website_map.items()
-    ]
+    # Warm the page cache so the first click on a section doesn't wait on a fetch.
+    # The URL list is only built (a scan of the pages table) when a run starts.
+    prefetcher.start(lambda: urls_to_prefetch(routing))
 
     welcome_data = {
         'message': 'How can I help you? Explore these sections from Stolmeier Law:',
-        'nav_items': nav_items
+        'nav_items': routing.nav_items
     }
     return jsonify(welcome_data)
 
-@app.route('/scrape_page', methods=['POST'])
-def scrape_page_endpoint():
-    """Scrape a specific page on-demand and return its targeted content."""
-    data = request.json
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Return runtime statistics used to size the scraper."""
+    return jsonify({
+        'driver_pool': get_pool_stats(),
+        'page_cache': get_cache_stats(),
+        'fetch': get_fetch_stats(),
+        'prefetch': get_prefetch_stats(),
+        'nlp': get_nlp_stats(),
+        'sessions': user_sessions.stats(),
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Return stage latency histograms, counters and runtime gauges for Prometheus."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+# Passages quoted when /chat falls back to full-text search
+SEARCH_RESULTS = int(os.environ.get('SEARCH_RESULTS', '3'))
+# /chat/batch: most items accepted per request, and pages looked up at once per batch
+CHAT_BATCH_MAX_ITEMS = int(os.environ.get('CHAT_BATCH_MAX_ITEMS', '500'))
+CHAT_BATCH_CONCURRENCY = int(os.environ.get('CHAT_BATCH_CONCURRENCY', '4'))
+
+FEEDBACK_PROMPT = "\n\nWas this helpful? (Reply 'yes' or 'no')"
+
+def reply_header(intent, section_title):
+    """Return the text that introduces a reply about a section."""
+    name = section_title.capitalize() if section_title else 'this section'
+    if intent == 'causes':
+        return f"Common Causes of {name}:\n"
+    if intent == 'about':
+        return f"About {name}:\n\n"
+    if intent == 'contact':
+        return "Stolmeier Law Contact Information:\n"
+    return f"Here’s what I found about {name}:\n\n"
+
+def sse_event(event, text):
+    """Format one server-sent event carrying a piece of reply text."""
+    return f"event: {event}\ndata: {json.dumps({'text': text})}\n\n"
+
+def stream_reply(header, intent, fetch_snippets, footer=''):
+    """Stream a reply as server-sent events: the header, each snippet, then the footer.
+
+    ``fetch_snippets`` is only called after the header has been sent, so the
+    client sees the section and intent while the page is still being fetched.
+    The ``text`` of every event concatenates to the non-streaming reply.
+    """
+    def generate():
+        yield sse_event('header', header)
+        snippets = fetch_snippets()
+        if snippets is None:
+            yield sse_event('snippet', FETCH_FAILED_MESSAGE)
+        else:
+            for chunk in iter_snippet_chunks(snippets, intent):
+                yield sse_event('snippet', chunk)
+        yield sse_event('done', footer)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def stream_message(text):
+    """Stream a reply that is already complete as a single event."""
+    return Response(sse_event('done', text), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def resolve_page_request(data, routing):
+    """Validate a /scrape_page request against the caller's routing index.
+
+    Returns (reply, None) when it can be answered straight away, otherwise
+    (None, (url, page_title, session_id)).
+    """
     url = data.get('url', '')
     session_id = data.get('session_id', 'default')
     if not url:
-        return jsonify({'response': 'No URL provided to scrape.'})
+        return 'No URL provided to scrape.', None
 
-    global website_map
-    if not website_map:
-        website_map = build_website_map()
-        if not website_map:
-            return jsonify({'response': 'Sorry, I couldn’t access the website to process your request.'})
+    if not routing.website_map:
+        return 'Sorry, I couldn’t access the website to process your request.', None
 
     # Find the page title or subcategory title corresponding to the URL
-    keywords = []
-    found = False
-
-    # Check main pages
-    for page_title, page_data in website_map.items():
-        if page_data['url'] == url:
-            keywords = [page_title]
-            found = True
-            break
-
-    # Check subcategories
-    if not found and 'practice areas' in website_map:
-        for sub_title, sub_data in website_map['practice areas']['subcategories'].items():
-            if sub_data['url'] == url:
-                keywords = [sub_title]
-                found = True
-                break
-
-    if not found:
-        return jsonify({'response': 'Sorry, I couldn’t find the requested section.'})
-
-    # Scrape the content immediately for the requested URL
-    response = scrape_targeted_content(keywords, 'description', session_id, url, website_map, user_sessions)
-    return jsonify({'response': f"Here’s what I found about {keywords[0].capitalize()}:\n\n{response}"})
+    page_title = routing.title_for_url(url)
+    if not page_title:
+        return 'Sorry, I couldn’t find the requested section.', None
+    return None, (url, page_title, session_id)
 
-@app.route('/chat', methods=['POST'])
-def chat():
-    data = request.json
-    user_message = data.get('message', '')
-    session_id = data.get('session_id', 'default')
-    if not user_message:
-        return jsonify({'response': 'Please provide a message.'})
-
-    global website_map
-    if not website_map:
-        website_map = build_website_map()
-        if not website_map:
-            return jsonify({'response': 'Sorry, I couldn’t access the website to process your request.'})
-
-    if any(keyword in user_message.lower() for keyword in ['contact', 'phone', 'email', 'address']):
-        contact_text = get_contact_info()
-        if contact_text:
-            return jsonify({'response': f"Stolmeier Law Contact Information:\n{contact_text}"})
-        contact_text = scrape_contact_info_fallback()
-        store_contact_info(contact_text)
-        return jsonify({'response': f"Stolmeier Law Contact Information:\n{contact_text}"})
+@app.route('/scrape_page', methods=['POST'])
+def scrape_page_endpoint():
+    """Return the description of a specific page, scraping it on demand if it wasn't ingested."""
+    routing = get_routing_index()
+    reply, target = resolve_page_request(request.json, routing)
+    if reply is not None:
+        return jsonify({'response': reply})
+    url, page_title, session_id = target
 
-    if user_message.lower() in ['yes', 'no']:
-        feedback = user_message.lower()
-        logging.debug(f"User feedback for session {session_id}: {feedback}")
-        return jsonify({'response': 'Thank you for your feedback! How can I assist you further?'})
+    # Look up (or scrape) the content for the requested URL
+    response = get_targeted_content([page_title], 'description', session_id, url, routing.website_map, user_sessions)
+    return jsonify({'response': reply_header('description', page_title) + response})
 
-    keywords, intent = extract_keywords_and_intent(user_message, session_id, website_map, user_sessions)
-    if not keywords:
-        return jsonify({'response': "Sorry, I couldn't understand your request. Could you provide more details?"})
+@app.route('/scrape_page/stream', methods=['POST'])
+def scrape_page_stream():
+    """Stream the description of a specific page as server-sent events."""
+    routing = get_routing_index()
+    reply, target = resolve_page_request(request.json, routing)
+    if reply is not None:
+        return stream_message(reply)
+    url, page_title, session_id = target
+    website_map = routing.website_map
+    return stream_reply(
+        reply_header('description', page_title), 'description',
+        lambda: get_targeted_snippets([page_title], 'description', session_id, url, website_map, user_sessions))
+
+def chat_fields(data):
+    """Return (message, session_id) from a chat request, ignoring values of the wrong type."""
+    if not isinstance(data, dict):
+        return '', 'default'
+    message = data.get('message')
+    session_id = data.get('session_id')
+    return (message if isinstance(message, str) else '',
+            session_id if isinstance(session_id, str) and session_id else 'default')
+
+def analyse_message(user_message, session_id, routing):
+    """Return (keywords, intent, url) for a message; url is None when it names no section."""
+    with stage('chat.intent'):
+        keywords, intent = extract_keywords_and_intent(user_message, session_id)
 
-    # Find the URL corresponding to the keywords
     url = None
-    for keyword in keywords:
-        keyword_lower = keyword.lower()
-        if keyword_lower in website_map:
-            url = website_map[keyword_lower]['url']
-            break
-        if 'practice areas' in website_map:
-            for sub_title in website_map['practice areas']['subcategories']:
-                if keyword_lower == sub_title:
-                    url = website_map['practice areas']['subcategories'][sub_title]['url']
+    if keywords:
+        with stage('chat.resolve'):
+            # Find the URL corresponding to the keywords, trying phrases like "car accident" first
+            for phrase in candidate_phrases(keywords):
+                url = routing.lookup(phrase)
+                if url:
                     break
 
+            if not url:
+                # Try fuzzy matching all keyword phrases against all sections at once
+                best_match = routing.matcher.best_match(keywords)
+                if best_match:
+                    url = routing.url_for_choice(best_match[0])
+    return keywords, intent, url
+
+def resolve_chat(data, routing, sessions, analyse=analyse_message):
+    """Work out how to answer a chat message.
+
+    ``routing`` is the index the caller also uses to title the reply, so a
+    refresh in between can't leave the matched URL without a section.
+    ``sessions`` supplies the visitor's context for follow-up questions.
+    ``analyse`` works out the keywords, intent and section of the message;
+    a batch passes one that remembers messages it has already seen.
+
+    Returns (reply, None) when the reply is already known (contact details,
+    feedback, nothing matched), otherwise (None, (keywords, intent, url,
+    session_id)) naming the section whose content answers the message.
+    """
+    user_message, session_id = chat_fields(data)
+    if not user_message:
+        return 'Please provide a message.', None
+
+    if not routing.website_map:
+        return 'Sorry, I couldn’t access the website to process your request.', None
+
+    if mentions_contact(user_message):
+        CHAT_REPLIES.inc(outcome='contact')
+        with stage('chat.contact'):
+            contact_text = get_contact_info()
+            if not contact_text:
+                contact_text = scrape_contact_info_fallback()
+                # A failure message would otherwise be served as the contact details from then on
+                if is_contact_info(contact_text):
+                    store_contact_info(contact_text)
+        return f"Stolmeier Law Contact Information:\n{contact_text}", None
+
+    if user_message.lower() in ['yes', 'no']:
+        feedback = user_message.lower()
+        logging.debug("User feedback for session %s: %s", session_id, feedback)
+        CHAT_REPLIES.inc(outcome='feedback')
+        return 'Thank you for your feedback! How can I assist you further?', None
+
+    keywords, intent, url = analyse(user_message, session_id, routing)
+
     if not url:
-        # Try fuzzy matching for keywords
-        all_sections = list(website_map.keys())
-        if 'practice areas' in website_map:
-            all_sections.extend(list(website_map['practice areas']['subcategories'].keys()))
-        for keyword in keywords:
-            best_match = process.extractOne(keyword, all_sections, scorer=fuzz.token_sort_ratio)
-            if best_match and best_match[1] > 80:
-                matched_section = best_match[0]
-                if matched_section in website_map:
-                    url = website_map[matched_section]['url']
-                    break
-                if 'practice areas' in website_map and matched_section in website_map['practice areas']['subcategories']:
-                    url = website_map['practice areas']['subcategories'][matched_section]['url']
-                    break
+        # A follow-up such as "what are the causes?" names no section; it refers
+        # to the page this visitor was last shown
+        url = follow_up_url(keywords, sessions.get(session_id), routing)
+        if url:
+            keywords = [routing.title_for_url(url)] + keywords
+
+    if not keywords:
+        CHAT_REPLIES.inc(outcome='not_understood')
+        return "Sorry, I couldn't understand your request. Could you provide more details?", None
 
     if not url:
-        logging.debug(f"No URL found for keywords: {keywords}")
-        return jsonify({'response': "Sorry, I couldn't find the requested section."})
+        # No section matches; the answer may still sit in a paragraph on some page
+        with stage('chat.search'):
+            results = search_content(keywords, limit=SEARCH_RESULTS)
+        if results:
+            CHAT_REPLIES.inc(outcome='search')
+            return format_search_results(results) + FEEDBACK_PROMPT, None
+        logging.debug("No URL found for keywords: %s", keywords)
+        CHAT_REPLIES.inc(outcome='no_section')
+        return "Sorry, I couldn't find the requested section.", None
 
-    response = scrape_targeted_content(keywords, intent, session_id, url, website_map, user_sessions)
-    
-    # Format the response based on intent
-    if intent == 'causes':
-        formatted_response = f"Common Causes of {keywords[0].capitalize()}:\n{response}"
-    elif intent == 'about':
-        formatted_response = f"About {keywords[0].capitalize()}:\n\n{response}"
-    elif intent == 'contact':
-        formatted_response = f"Stolmeier Law Contact Information:\n{response}"
-    else:
-        formatted_response = f"Here’s what I found about {keywords[0].capitalize()}:\n\n{response}"
+    CHAT_REPLIES.inc(outcome=intent)
+    return None, (keywords, intent, url, session_id)
+
+@app.route('/chat', methods=['POST'])
+def chat():
+    routing = get_routing_index()
+    reply, target = resolve_chat(request.json, routing, user_sessions)
+    if reply is not None:
+        return jsonify({'response': reply})
+    keywords, intent, url, session_id = target
+
+    with stage('chat.content'):
+        response = get_targeted_content(keywords, intent, session_id, url, routing.website_map, user_sessions)
+
+    # Format the response based on intent, naming the section that was matched
+    header = reply_header(intent, routing.title_for_url(url))
+    return jsonify({'response': header + response + FEEDBACK_PROMPT})
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Answer a chat message as server-sent events.
+
+    The section and intent header is sent as soon as the message is resolved,
+    then each snippet, then the feedback prompt.
+    """
+    routing = get_routing_index()
+    reply, target = resolve_chat(request.json, routing, user_sessions)
+    if reply is not None:
+        return stream_message(reply)
+    keywords, intent, url, session_id = target
+
+    def fetch_snippets():
+        with stage('chat.content'):
+            return get_targeted_snippets(keywords, intent, session_id, url, routing.website_map, user_sessions)
+
+    return stream_reply(reply_header(intent, routing.title_for_url(url)), intent, fetch_snippets, FEEDBACK_PROMPT)
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer many chat messages at once, returning replies in input order.
+
+    Accepts a JSON list of ``{message, session_id}`` items (or ``{"items": [...]}``).
+    Every message is resolved to a section first, in order, so a follow-up
+    sees the context left by an earlier item of the same session; distinct
+    messages are analysed once and every session is loaded in one query. Items are
+    then grouped by URL and each page is looked up (fetched and parsed, if it
+    wasn't ingested) once, at most CHAT_BATCH_CONCURRENCY pages at a time.
+    """
+    data = request.json
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected a list of {message, session_id} items.'}), 400
+    if len(items) > CHAT_BATCH_MAX_ITEMS:
+        return jsonify({'error': f'At most {CHAT_BATCH_MAX_ITEMS} items per batch.'}), 400
+
+    routing = get_routing_index()
+    replies = [None] * len(items)
+    by_url = {}
+    # Session context is read in one query and written once for the whole batch
+    sessions = PendingSessions(user_sessions)
+    analysed = {}
+
+    def analyse(user_message, session_id, routing):
+        # Repeated messages are tokenized, classified and matched only once
+        if user_message not in analysed:
+            analysed[user_message] = analyse_message(user_message, session_id, routing)
+        return analysed[user_message]
+
+    with stage('chat.batch.resolve'):
+        sessions.load(chat_fields(item)[1] for item in items)
+        for position, item in enumerate(items):
+            reply, target = resolve_chat(item, routing, sessions, analyse)
+            if reply is not None:
+                replies[position] = reply
+                continue
+            keywords, intent, url, session_id = target
+            page_title, _ = routing.page_for_url(url)
+            if page_title:
+                sessions.save(Session(session_id, url, page_title, intent, keywords))
+            by_url.setdefault(url, []).append((position, keywords, intent, session_id))
+        sessions.flush()
+
+    def answer_page(url, group):
+        # Intents asked of the same page share one fetch and one extraction pass
+        snippets_by_intent = {}
+        for position, keywords, intent, session_id in group:
+            if intent not in snippets_by_intent:
+                snippets_by_intent[intent] = get_targeted_snippets(
+                    keywords, intent, session_id, url, routing.website_map, None)
+            snippets = snippets_by_intent[intent]
+            response = FETCH_FAILED_MESSAGE if snippets is None else format_snippets(snippets, intent)
+            replies[position] = reply_header(intent, routing.title_for_url(url)) + response + FEEDBACK_PROMPT
+
+    with stage('chat.batch.content'):
+        with ThreadPoolExecutor(max_workers=max(1, CHAT_BATCH_CONCURRENCY), thread_name_prefix='chat-batch') as executor:
+            futures = {url: executor.submit(answer_page, url, group) for url, group in by_url.items()}
+            for url, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error("Error answering batch items for %s: %s", url, e)
+                    for position, *_ in by_url[url]:
+                        replies[position] = replies[position] or FETCH_FAILED_MESSAGE
 
-    return jsonify({'response': formatted_response + "\n\nWas this helpful? (Reply 'yes' or 'no')"})
+    return jsonify({'responses': [
+        {'session_id': chat_fields(item)[1], 'response': reply}
+        for item, reply in zip(items, replies)
+    ]})
 
 if __name__ == '__main__':
-    init_db()
+    if FETCH_MODE != 'requests':
+        try:
+            get_driver_pool().resolve_driver()
+        except Exception as e:
+            logging.error("Could not resolve chromedriver at startup: %s", e)
+    prefetcher.start(lambda: urls_to_prefetch(get_routing_index()))
     app.run(debug=True)
\ No newline at end of file
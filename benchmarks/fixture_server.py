@@ -0,0 +1,133 @@
+"""Serve recorded copies of the site's pages so benchmarks never touch the live site.
+
+Fixtures live in benchmarks/fixtures/, one HTML file per page path (the home
+page is ``index.html``, ``/car-accidents/`` is ``car-accidents.html``). Pages
+without a recording are served as a generated stand-in with the same shape
+(headings, cause lists, about paragraphs, contact footer).
+
+    python -m benchmarks.fixture_server --record   # capture the live pages
+    python -m benchmarks.fixture_server --port 8765
+"""
+import argparse
+import http.server
+import logging
+import os
+import threading
+import zlib
+from urllib.parse import urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def fixture_name(path):
+    """Map a URL path to its fixture file name."""
+    slug = path.strip('/').replace('/', '__')
+    return f"{slug or 'index'}.html"
+
+
+def stand_in_page(path):
+    """Generate a representative page for a path with no recorded fixture."""
+    title = path.strip('/').replace('-', ' ').title() or 'Stolmeier Law'
+    filler = ('Our attorneys have helped injured clients and families across Texas recover '
+              'compensation after serious losses, and we will fight for you too.')
+    causes = ''.join(f"<li>{cause} related to {title.lower()}</li>" for cause in
+                     ('Distracted driving', 'Speeding', 'Negligent maintenance', 'Fatigue', 'Poor training'))
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><title>{title} | Stolmeier Law</title>
+<script>window.dataLayer = window.dataLayer || [];</script></head>
+<body>
+<header><nav><a href="/">Home</a> <a href="/practice-areas/">Practice Areas</a> <a href="/contact-us/">Contact Us</a></nav></header>
+<main>
+<h1>{title}</h1>
+<p>{title} cases are complex, and the team at Stolmeier Law knows how to handle them. {filler}</p>
+<p>Every case begins with a free consultation where we listen to your story. {filler}</p>
+<h2>Common Causes of {title}</h2>
+<p>Many incidents share a handful of preventable causes that insurers try to downplay.</p>
+<ul>{causes}</ul>
+<h2>About Stolmeier Law</h2>
+<p>Stolmeier Law is a San Antonio firm that has represented clients for decades. {filler}</p>
+<p>We work on a contingency fee basis, so you pay nothing unless we win your case. {filler}</p>
+{''.join(f'<h3>Frequently asked question {i}</h3><p>{filler}</p>' for i in range(1, 6))}
+</main>
+<footer>
+<p>Phone: (210) 555-0100</p>
+<p>Email: info@stolmeierlaw.com</p>
+<p>Address: 123 Main Street, San Antonio, TX</p>
+</footer>
+</body></html>"""
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        fixture = os.path.join(FIXTURES_DIR, fixture_name(path))
+        if os.path.exists(fixture):
+            with open(fixture, 'rb') as f:
+                body = f.read()
+        else:
+            body = stand_in_page(path).encode('utf-8')
+        etag = f'"{zlib.crc32(body):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(host='127.0.0.1', port=0):
+    """Start the fixture server in a daemon thread and return (server, origin URL)."""
+    server = http.server.ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='fixture-server', daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def record_fixtures():
+    """Download every page in build_website_map() into the fixtures directory."""
+    from scraper import build_website_map, get_http_session
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    urls = []
+    for page_data in build_website_map().values():
+        urls.append(page_data['url'])
+        urls.extend(sub['url'] for sub in page_data.get('subcategories', {}).values())
+    for url in urls:
+        response = get_http_session().get(url, timeout=30)
+        response.raise_for_status()
+        path = os.path.join(FIXTURES_DIR, fixture_name(urlsplit(url).path))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        logging.info("Recorded %s -> %s", url, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--record', action='store_true', help='record the live pages instead of serving')
+    args = parser.parse_args()
+    if args.record:
+        record_fixtures()
+        return
+    server, origin = start_fixture_server(args.host, args.port)
+    print(f"Serving fixtures at {origin} (set SCRAPER_ORIGIN_OVERRIDE={origin})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
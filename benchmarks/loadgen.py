@@ -0,0 +1,291 @@
+"""Replay a message corpus against /chat, /scrape_page and /welcome and report latency.
+
+By default the app runs in-process against the local fixture server (no live
+site, no browser) with a throwaway database:
+
+    python -m benchmarks.loadgen --requests 500 --concurrency 8
+    python -m benchmarks.loadgen --ingest            # answer from pre-extracted content
+    python -m benchmarks.loadgen --target http://127.0.0.1:5000   # an already running app
+
+The corpus is a JSON-lines file; each line's "message" (or "title") field is
+sent to /chat. Results are printed and written to benchmarks/results/ as JSON
+so runs can be compared over time.
+"""
+import argparse
+import itertools
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks.fixture_server import start_fixture_server
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CORPUS = os.path.join(BENCHMARKS_DIR, 'corpus.jsonl')
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+DEFAULT_MIX = 'chat=70,scrape_page=20,welcome=10'
+
+
+def load_corpus(path):
+    """Read the messages to replay from a JSON-lines file."""
+    messages = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            message = record.get('message') or record.get('title')
+            if message:
+                messages.append(message)
+    return messages
+
+
+def parse_mix(mix):
+    """Parse 'chat=70,scrape_page=20,welcome=10' into an interleaved endpoint schedule.
+
+    The schedule holds each endpoint as many times as its weight, spread out
+    by smooth weighted round-robin (chat, chat, scrape_page, chat, welcome,
+    ...) so every stretch of requests, however short, carries the same mix.
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = weights.get(name.strip(), 0) + int(weight or 1)
+    weights = {name: weight for name, weight in weights.items() if weight > 0}
+    total = sum(weights.values())
+    current = dict.fromkeys(weights, 0)
+    schedule = []
+    for _ in range(total):
+        for name, weight in weights.items():
+            current[name] += weight
+        name = max(current, key=current.get)
+        current[name] -= total
+        schedule.append(name)
+    return schedule
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, elapsed):
+    """Throughput and latency percentiles (ms) for a list of (latency_s, ok) samples."""
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+def start_app_in_process(ingest=False):
+    """Start the Flask app on a local port, fetching from the fixture server."""
+    _, origin = start_fixture_server()
+    # Forced rather than defaulted: an exported value (even an empty one) would
+    # send the "offline" run to the live site or start Chrome, and an exported
+    # CHATBOT_DB_PATH may be the production database, which the run would
+    # ingest into and fill with sessions
+    os.environ['SCRAPER_ORIGIN_OVERRIDE'] = origin
+    os.environ['SCRAPER_FETCH_MODE'] = 'requests'
+    os.environ['CHATBOT_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='chatbot-bench-'), 'bench.db')
+    os.environ.setdefault('NLP_TOKENIZER', 'regex')
+
+    from werkzeug.serving import make_server
+    import app as chatbot
+    import database
+    import scraper
+    # Settings are read at import, so a module imported earlier keeps its own
+    if (scraper.ORIGIN_OVERRIDE, scraper.FETCH_MODE, database.DB_PATH) != (
+            origin, 'requests', os.environ['CHATBOT_DB_PATH']):
+        raise RuntimeError("The app was imported before the benchmark configured it; "
+                           "run the in-process benchmark as `python -m benchmarks.loadgen`.")
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    if ingest:
+        from ingest import run_ingest
+        run_ingest()
+
+    server = make_server('127.0.0.1', 0, chatbot.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-app', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def discover_urls(target):
+    """Collect every section URL from /welcome for the /scrape_page workload."""
+    nav_items = requests.get(f"{target}/welcome", timeout=30).json()['nav_items']
+    urls = []
+    for item in nav_items:
+        urls.append(item['url'])
+        urls.extend(sub['url'] for sub in item.get('subcategories', []))
+    return urls
+
+
+def classify(message):
+    from nlp import detect_intent
+    return detect_intent(message.lower())
+
+
+def run_load(target, messages, urls, schedule, total_requests, concurrency, duration=None):
+    """Issue requests from ``concurrency`` closed-loop workers and collect samples."""
+    jobs = itertools.cycle(schedule)
+    message_cycle = itertools.cycle(messages)
+    url_cycle = itertools.cycle(urls)
+    lock = threading.Lock()
+    samples = []
+    issued = [0]
+    deadline = time.monotonic() + duration if duration else None
+
+    def next_job():
+        with lock:
+            if total_requests and issued[0] >= total_requests:
+                return None
+            if deadline and time.monotonic() >= deadline:
+                return None
+            issued[0] += 1
+            endpoint = next(jobs)
+            if endpoint == 'chat':
+                return endpoint, next(message_cycle)
+            if endpoint == 'scrape_page':
+                return endpoint, next(url_cycle)
+            return endpoint, None
+
+    def worker(worker_id):
+        session = requests.Session()
+        while True:
+            job = next_job()
+            if job is None:
+                return
+            endpoint, payload = job
+            started = time.perf_counter()
+            try:
+                if endpoint == 'chat':
+                    response = session.post(f"{target}/chat", json={'message': payload, 'session_id': f'bench-{worker_id}'}, timeout=60)
+                elif endpoint == 'scrape_page':
+                    response = session.post(f"{target}/scrape_page", json={'url': payload, 'session_id': f'bench-{worker_id}'}, timeout=60)
+                else:
+                    response = session.get(f"{target}/welcome", timeout=60)
+                ok = response.ok
+            except requests.RequestException:
+                ok = False
+            latency = time.perf_counter() - started
+            intent = classify(payload) if endpoint == 'chat' else None
+            with lock:
+                samples.append((endpoint, intent, latency, ok))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def build_report(samples, elapsed, config):
+    by_endpoint = defaultdict(list)
+    by_intent = defaultdict(list)
+    for endpoint, intent, latency, ok in samples:
+        by_endpoint[endpoint].append((latency, ok))
+        if intent:
+            by_intent[intent].append((latency, ok))
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'config': config,
+        'elapsed_seconds': round(elapsed, 3),
+        'overall': summarize([(latency, ok) for _, _, latency, ok in samples], elapsed),
+        'endpoints': {name: summarize(values, elapsed) for name, values in sorted(by_endpoint.items())},
+        'chat_intents': {name: summarize(values, elapsed) for name, values in sorted(by_intent.items())},
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=BENCHMARKS_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    header = f"{'':28}{'reqs':>7}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    rows = [('overall', report['overall'])]
+    rows += [(f"/{name}", stats) for name, stats in report['endpoints'].items()]
+    rows += [(f"/chat intent={name}", stats) for name, stats in report['chat_intents'].items()]
+    for name, stats in rows:
+        print(f"{name:28}{stats['requests']:>7}{stats['errors']:>8}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', help='base URL of a running app (default: start one in-process)')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'endpoint weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--requests', type=int, default=300, help='total requests to issue')
+    parser.add_argument('--duration', type=float, help='stop after this many seconds instead')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=20, help='requests issued before measuring')
+    parser.add_argument('--ingest', action='store_true', help='pre-extract content before measuring (in-process only)')
+    parser.add_argument('--output-dir', default=DEFAULT_RESULTS_DIR)
+    args = parser.parse_args(argv)
+    if args.requests <= 0:
+        parser.error('--requests must be positive')
+    if args.duration is not None and args.duration <= 0:
+        parser.error('--duration must be positive')
+    schedule = parse_mix(args.mix)
+    if not schedule:
+        parser.error('--mix must give at least one endpoint a positive weight')
+
+    target = args.target or start_app_in_process(ingest=args.ingest)
+    messages = load_corpus(args.corpus)
+    urls = discover_urls(target)
+
+    if args.warmup:
+        run_load(target, messages, urls, schedule, args.warmup, args.concurrency)
+    samples, elapsed = run_load(target, messages, urls, schedule,
+                                None if args.duration else args.requests, args.concurrency, args.duration)
+
+    config = {
+        'target': args.target or 'in-process',
+        'corpus': os.path.relpath(args.corpus),
+        'mix': args.mix,
+        'concurrency': args.concurrency,
+        'requests': args.requests if not args.duration else None,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'ingest': args.ingest,
+    }
+    report = build_report(samples, elapsed, config)
+    print_report(report)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"{report['timestamp'].replace(':', '')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {path}")
+    return report
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,301 @@
+"""Incrementally crawl the site and keep website_map.db's pre-extracted content current.
+
+Pages are discovered from the sitemap(s) and from in-site links, starting at
+the pages in the built-in website map. For every URL the crawler records the
+sitemap lastmod, the ETag/Last-Modified validators and a hash of the HTML, so
+later runs skip pages whose lastmod is unchanged, revalidate the rest with a
+conditional request and only re-extract pages whose content actually changed:
+
+    python crawler.py
+
+Pages found beyond the built-in map are added to the routing map as
+subcategories of the section they belong under (see parent_for and
+scraper.load_website_map).
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import requests
+
+from scraper import build_website_map, get_http_session, origin_url, parse_html, needs_javascript, fetch_page, \
+    scrape_contact_info_fallback, is_contact_info, iter_pages
+from extractor import extract_sections
+from database import init_db, store_crawl, store_contact_info, get_crawl_state
+
+logging.basicConfig(level=logging.DEBUG)
+
+CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', '4'))
+CRAWL_MAX_PAGES = int(os.environ.get('CRAWL_MAX_PAGES', '200'))
+CRAWL_MAX_DEPTH = int(os.environ.get('CRAWL_MAX_DEPTH', '3'))
+SITEMAP_PATHS = ('sitemap.xml', 'sitemap_index.xml', 'wp-sitemap.xml')
+# Links that never lead to a content page
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.ico', '.zip', '.doc', '.docx',
+                   '.xml', '.css', '.js', '.mp3', '.mp4', '.txt')
+SKIP_PATH_PARTS = ('/wp-admin', '/wp-content', '/wp-includes', '/wp-json', '/feed', '/tag/', '/author/',
+                   '/category/', '/page/')
+
+
+def normalize_url(url, base_url):
+    """Return ``url`` without query/fragment if it is a crawlable page on the base host, else None."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or parts.netloc.lower() != urlsplit(base_url).netloc.lower():
+        return None
+    path = parts.path or '/'
+    lowered = path.lower()
+    if lowered.endswith(SKIP_EXTENSIONS) or any(part in lowered for part in SKIP_PATH_PARTS):
+        return None
+    base = urlsplit(base_url)
+    return urlunsplit((base.scheme, base.netloc, path, '', ''))
+
+
+def extract_links(soup, page_url, base_url):
+    """Return the distinct in-site page URLs linked from a page, in document order."""
+    links = {}
+    for anchor in soup.find_all('a', href=True):
+        url = normalize_url(urljoin(page_url, anchor['href'].strip()), base_url)
+        if url and url != page_url:
+            links.setdefault(url, None)
+    return list(links)
+
+
+def page_title_of(soup, url):
+    """Name a discovered page after its first <h1>, or its URL slug."""
+    h1 = soup.find('h1')
+    title = h1.get_text(' ', strip=True) if h1 else ''
+    if not title:
+        title = urlsplit(url).path.strip('/').rsplit('/', 1)[-1].replace('-', ' ').replace('_', ' ')
+    return ' '.join(title.lower().split())
+
+
+def _parse_sitemap(xml_text):
+    """Return (page [(loc, lastmod)], child sitemap locs) from a sitemap or sitemap index."""
+    root = ElementTree.fromstring(xml_text)
+    pages, children = [], []
+    for node in root:
+        loc = lastmod = None
+        for child in node:
+            tag = child.tag.rsplit('}', 1)[-1]
+            if tag == 'loc':
+                loc = (child.text or '').strip()
+            elif tag == 'lastmod':
+                lastmod = (child.text or '').strip() or None
+        if not loc:
+            continue
+        if root.tag.rsplit('}', 1)[-1] == 'sitemapindex':
+            children.append(loc)
+        else:
+            pages.append((loc, lastmod))
+    return pages, children
+
+
+def read_sitemaps(base_url, max_sitemaps=20):
+    """Return {url: lastmod} from the site's sitemaps (robots.txt entries and the usual paths)."""
+    session = get_http_session()
+    queue = [urljoin(base_url, path) for path in SITEMAP_PATHS]
+    try:
+        robots = session.get(origin_url(urljoin(base_url, 'robots.txt')), timeout=10)
+        if robots.ok:
+            queue = [line.split(':', 1)[1].strip() for line in robots.text.splitlines()
+                     if line.lower().startswith('sitemap:')] + queue
+    except requests.RequestException as e:
+        logging.debug("No robots.txt for %s: %s", base_url, e)
+
+    seen = set()
+    entries = {}
+    while queue and len(seen) < max_sitemaps:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        try:
+            response = session.get(origin_url(sitemap_url), timeout=10)
+            if not response.ok:
+                continue
+            pages, children = _parse_sitemap(response.content)
+        except (requests.RequestException, ElementTree.ParseError) as e:
+            logging.debug("Skipping sitemap %s: %s", sitemap_url, e)
+            continue
+        queue.extend(children)
+        for loc, lastmod in pages:
+            url = normalize_url(loc, base_url)
+            if url:
+                entries[url] = lastmod
+    logging.debug("Found %s pages in %s sitemaps.", len(entries), len(seen))
+    return entries
+
+
+def parent_for(url, website_map):
+    """Pick the top-level section a discovered page belongs under.
+
+    That is the section whose URL path is the longest prefix of the page's
+    path. Failing that, it is the section whose subcategories sit in the same
+    directory as the page: the practice pages live at the site root
+    (``/car-accidents/``), so a new one like ``/truck-accidents/`` joins
+    them under practice areas. Anything else falls back to the section at
+    the site root.
+    """
+    path = urlsplit(url).path
+    directory = _directory_of(path)
+    best, best_length, sibling, root = None, 0, None, None
+    for title, data in website_map.items():
+        section_path = urlsplit(data['url']).path or '/'
+        if section_path == '/':
+            root = root or title
+        elif path.startswith(section_path) and len(section_path) > best_length:
+            best, best_length = title, len(section_path)
+        if sibling is None and any(_directory_of(urlsplit(sub['url']).path) == directory
+                                   for sub in data.get('subcategories', {}).values()):
+            sibling = title
+    return best or sibling or root
+
+
+def _directory_of(path):
+    """Return the directory holding a page path, e.g. '/' for '/car-accidents/'."""
+    return (path or '/').rstrip('/').rsplit('/', 1)[0] + '/'
+
+
+class Crawler:
+    """Discover and incrementally re-extract the site's pages.
+
+    Pages are crawled breadth-first from the built-in map and the sitemap,
+    ``concurrency`` at a time, up to ``max_pages`` pages and ``max_depth``
+    links away from a seed.
+    """
+
+    def __init__(self, base_url='https://stolmeierlaw.com/', concurrency=CRAWL_CONCURRENCY,
+                 max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH):
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.website_map = build_website_map(base_url)
+        self.known = {url: (title, parent) for title, url, parent in iter_pages(self.website_map)}
+        self.counts = dict.fromkeys(('crawled', 'lastmod_unchanged', 'not_modified', 'unchanged',
+                                     'changed', 'failed', 'gone'), 0)
+
+    def _identify(self, url, title):
+        """Return (page_title, parent_page, discovered) for a URL; ``title`` names discovered pages."""
+        if url in self.known:
+            known_title, parent = self.known[url]
+            return known_title, parent, 0
+        return title, parent_for(url, self.website_map), 1
+
+    def crawl_page(self, url, lastmod, previous):
+        """Crawl one URL.
+
+        Returns ``(outcome, state, row, links)``: the outcome counter to bump,
+        the crawl-state row (None if the page failed), the store_pages row if
+        the page changed, and the links to follow.
+        """
+        prev_lastmod, prev_etag, prev_last_modified, prev_hash, prev_links, prev_title, prev_parent = \
+            previous or (None,) * 7
+        prev_links = json.loads(prev_links) if prev_links else []
+        # Only trust the previous crawl if it fully extracted the page under the
+        # section it belongs to now; snippets are stored per parent section
+        crawled_before = bool(prev_hash and prev_title) and self._identify(url, prev_title)[1] == prev_parent
+        now = time.time()
+
+        def unchanged_state(etag=prev_etag, last_modified=prev_last_modified):
+            title, parent, discovered = self._identify(url, prev_title)
+            return (url, title, parent, discovered, lastmod or prev_lastmod, etag, last_modified,
+                    prev_hash, json.dumps(prev_links), now)
+
+        if crawled_before and lastmod and lastmod == prev_lastmod:
+            return 'lastmod_unchanged', unchanged_state(), None, prev_links
+
+        headers = {}
+        if crawled_before:
+            if prev_etag:
+                headers['If-None-Match'] = prev_etag
+            if prev_last_modified:
+                headers['If-Modified-Since'] = prev_last_modified
+        try:
+            response = get_http_session().get(origin_url(url), headers=headers, timeout=10)
+        except requests.RequestException as e:
+            logging.error("Error crawling %s: %s", url, e)
+            return 'failed', None, None, prev_links
+        if response.status_code in (404, 410):
+            return 'gone', None, None, []
+        if response.status_code == 304 and crawled_before:
+            return 'not_modified', unchanged_state(), None, prev_links
+        if not response.ok:
+            logging.error("Error crawling %s: HTTP %s", url, response.status_code)
+            return 'failed', None, None, prev_links
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if content_hash == prev_hash and crawled_before:
+            return 'unchanged', unchanged_state(etag, last_modified), None, prev_links
+
+        soup = parse_html(response.text)
+        links = extract_links(soup, url, self.base_url)
+        if needs_javascript(soup):
+            rendered = fetch_page(url, mode='browser', use_cache=False)
+            if rendered is not None:
+                soup = rendered
+        title, parent, discovered = self._identify(url, page_title_of(soup, url))
+        state = (url, title, parent, discovered, lastmod, etag, last_modified, content_hash, json.dumps(links), now)
+        row = (title, url, parent, extract_sections(soup, url).as_dict())
+        return 'changed', state, row, links
+
+    def run(self):
+        """Crawl the site and store what changed. Returns the outcome counts."""
+        init_db()
+        previous = get_crawl_state()
+        sitemap = read_sitemaps(self.base_url)
+        frontier = list(dict.fromkeys(list(self.known) + list(sitemap)))
+        seen = set(frontier)
+        rows, states, gone = [], [], []
+        # Snippets are stored per (title, parent), so a discovered page must not
+        # reuse the title of another page or it would overwrite that page's content.
+        title_owners = {state[5]: url for url, state in previous.items() if state[5]}
+        title_owners.update((title, url) for url, (title, _) in self.known.items())
+        depth = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawl') as executor:
+            while frontier and self.counts['crawled'] < self.max_pages:
+                batch = frontier[:self.max_pages - self.counts['crawled']]
+                results = executor.map(lambda url: (url, self.crawl_page(url, sitemap.get(url), previous.get(url))),
+                                       batch)
+                next_frontier = []
+                for url, (outcome, state, row, links) in results:
+                    self.counts['crawled'] += 1
+                    self.counts[outcome] += 1
+                    if state is not None:
+                        states.append(state)
+                    if row is not None and title_owners.setdefault(row[0], url) == url:
+                        rows.append(row)
+                    if outcome == 'gone' and url not in self.known and url in previous:
+                        gone.append(url)
+                    if depth < self.max_depth:
+                        for link in links:
+                            if link not in seen:
+                                seen.add(link)
+                                next_frontier.append(link)
+                frontier = next_frontier
+                depth += 1
+
+        store_crawl(rows, states, gone)
+        if any(row[1] == self.base_url for row in rows):
+            contact_text = scrape_contact_info_fallback()
+            if is_contact_info(contact_text):
+                store_contact_info(contact_text)
+        logging.info("Crawl finished: %s", ', '.join(f"{count} {name}" for name, count in self.counts.items()))
+        return dict(self.counts)
+
+
+def run_crawl(base_url='https://stolmeierlaw.com/'):
+    """Run one incremental crawl. Returns the outcome counts."""
+    return Crawler(base_url).run()
+
+
+if __name__ == '__main__':
+    counts = run_crawl()
+    sys.exit(1 if counts['failed'] else 0)
@@ -1,60 +1,545 @@
 import sqlite3
 import logging
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
 
 logging.basicConfig(level=logging.DEBUG)
 
+DB_PATH = os.environ.get('CHATBOT_DB_PATH', 'website_map.db')
+# Most connections a process keeps open, and how long a caller waits for a
+# free one before the call fails like any other sqlite3 error
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+
+# Pragmas applied to every pooled connection. WAL lets readers in other threads
+# and worker processes proceed while the ingest job writes.
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-8000',
+    'PRAGMA busy_timeout=5000',
+)
+
+# Statements are kept as module constants so sqlite3's per-connection
+# statement cache reuses the prepared statement on every call.
+INSERT_CONTENT_SQL = "INSERT OR IGNORE INTO website_content (page_title, url, tag, content) VALUES (?, ?, ?, ?)"
+DELETE_CONTENT_SQL = "DELETE FROM website_content WHERE page_title = ? AND tag = ?"
+SELECT_CONTENT_SQL = "SELECT content FROM website_content WHERE page_title = ? AND tag = ? ORDER BY rowid"
+INSERT_SUBCATEGORY_SQL = "INSERT OR IGNORE INTO subcategories (parent_page, sub_title, url, tag, content) VALUES (?, ?, ?, ?, ?)"
+DELETE_SUBCATEGORY_SQL = "DELETE FROM subcategories WHERE parent_page = ? AND sub_title = ? AND tag = ?"
+SELECT_SUBCATEGORY_SQL = "SELECT content FROM subcategories WHERE sub_title = ? AND tag = ? AND parent_page = ? ORDER BY rowid"
+# An upsert rather than INSERT OR REPLACE, so the crawler's columns survive a re-ingest
+MARK_INGESTED_SQL = (
+    "INSERT INTO pages (url, page_title, parent_page, ingested_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(url) DO UPDATE SET page_title = excluded.page_title, parent_page = excluded.parent_page, "
+    "ingested_at = excluded.ingested_at"
+)
+SELECT_INGESTED_SQL = "SELECT 1 FROM pages WHERE page_title = ? AND parent_page IS ?"
+SELECT_INGESTED_URLS_SQL = "SELECT url FROM pages WHERE ingested_at IS NOT NULL"
+# Parenthesized so the keyword filter only applies within the contact page's
+# rows, which the (page_title, tag) index narrows down first.
+SELECT_CONTACT_SQL = (
+    "SELECT content FROM website_content WHERE page_title = ? AND tag = ? "
+    "AND (content LIKE '%contact%' OR content LIKE '%phone%' OR content LIKE '%email%' OR content LIKE '%address%') "
+    "ORDER BY rowid"
+)
+
+SAVE_CRAWL_STATE_SQL = (
+    "INSERT INTO pages (url, page_title, parent_page, discovered, lastmod, etag, last_modified, content_hash, links, crawled_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(url) DO UPDATE SET page_title = excluded.page_title, parent_page = excluded.parent_page, "
+    "discovered = excluded.discovered, lastmod = excluded.lastmod, etag = excluded.etag, "
+    "last_modified = excluded.last_modified, content_hash = excluded.content_hash, links = excluded.links, "
+    "crawled_at = excluded.crawled_at"
+)
+SELECT_CRAWL_STATE_SQL = ("SELECT url, lastmod, etag, last_modified, content_hash, links, page_title, parent_page "
+                          "FROM pages WHERE crawled_at IS NOT NULL")
+SELECT_DISCOVERED_SQL = "SELECT url, page_title, parent_page FROM pages WHERE discovered = 1 ORDER BY url"
+DELETE_PAGE_SQL = "DELETE FROM pages WHERE url = ?"
+DELETE_PAGE_SUBCATEGORIES_SQL = "DELETE FROM subcategories WHERE url = ?"
+
+# Columns added to ``pages`` by the incremental crawler, for databases created before it
+CRAWL_COLUMNS = (
+    ('discovered', 'INTEGER DEFAULT 0'),
+    ('lastmod', 'TEXT'),
+    ('etag', 'TEXT'),
+    ('last_modified', 'TEXT'),
+    ('content_hash', 'TEXT'),
+    ('links', 'TEXT'),
+    ('crawled_at', 'REAL'),
+)
+
+# Full-text index over the snippets stored for each intent; rows under any
+# other tag (raw HTML tags left by older ingests) are not worth quoting. Rows
+# mirror website_content (rowid * 2) and subcategories (rowid * 2 + 1) and are
+# kept in step by triggers, so every write path updates the index in the same
+# transaction.
+SEARCH_TAGS = ('causes', 'about', 'contact', 'description')
+_SEARCH_TAG_LIST = ', '.join(f"'{tag}'" for tag in SEARCH_TAGS)
+SEARCH_TABLE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "content, page_title UNINDEXED, parent_page UNINDEXED, url UNINDEXED, tag UNINDEXED, "
+    "tokenize = 'porter unicode61 remove_diacritics 2')"
+)
+# Written without IF NOT EXISTS so they match sqlite_master, which is how
+# _init_search_index spots triggers left by an older definition.
+SEARCH_TRIGGERS_SQL = (
+    f"""CREATE TRIGGER website_content_search_insert AFTER INSERT ON website_content
+    WHEN new.tag IN ({_SEARCH_TAG_LIST}) BEGIN
+        INSERT INTO search_index (rowid, content, page_title, parent_page, url, tag)
+        VALUES (new.rowid * 2, new.content, new.page_title, NULL, new.url, new.tag);
+    END""",
+    """CREATE TRIGGER website_content_search_delete AFTER DELETE ON website_content BEGIN
+        DELETE FROM search_index WHERE rowid = old.rowid * 2;
+    END""",
+    f"""CREATE TRIGGER website_content_search_update AFTER UPDATE ON website_content BEGIN
+        DELETE FROM search_index WHERE rowid = old.rowid * 2;
+        INSERT INTO search_index (rowid, content, page_title, parent_page, url, tag)
+        SELECT new.rowid * 2, new.content, new.page_title, NULL, new.url, new.tag
+        WHERE new.tag IN ({_SEARCH_TAG_LIST});
+    END""",
+    f"""CREATE TRIGGER subcategories_search_insert AFTER INSERT ON subcategories
+    WHEN new.tag IN ({_SEARCH_TAG_LIST}) BEGIN
+        INSERT INTO search_index (rowid, content, page_title, parent_page, url, tag)
+        VALUES (new.rowid * 2 + 1, new.content, new.sub_title, new.parent_page, new.url, new.tag);
+    END""",
+    """CREATE TRIGGER subcategories_search_delete AFTER DELETE ON subcategories BEGIN
+        DELETE FROM search_index WHERE rowid = old.rowid * 2 + 1;
+    END""",
+    f"""CREATE TRIGGER subcategories_search_update AFTER UPDATE ON subcategories BEGIN
+        DELETE FROM search_index WHERE rowid = old.rowid * 2 + 1;
+        INSERT INTO search_index (rowid, content, page_title, parent_page, url, tag)
+        SELECT new.rowid * 2 + 1, new.content, new.sub_title, new.parent_page, new.url, new.tag
+        WHERE new.tag IN ({_SEARCH_TAG_LIST});
+    END""",
+)
+SELECT_SEARCH_TRIGGERS_SQL = (
+    "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+    "AND name IN ('website_content_search_insert', 'website_content_search_delete', "
+    "'website_content_search_update', 'subcategories_search_insert', "
+    "'subcategories_search_delete', 'subcategories_search_update')"
+)
+REBUILD_SEARCH_SQL = (
+    "DELETE FROM search_index",
+    "INSERT INTO search_index (rowid, content, page_title, parent_page, url, tag) "
+    f"SELECT rowid * 2, content, page_title, NULL, url, tag FROM website_content WHERE tag IN ({_SEARCH_TAG_LIST})",
+    "INSERT INTO search_index (rowid, content, page_title, parent_page, url, tag) "
+    f"SELECT rowid * 2 + 1, content, sub_title, parent_page, url, tag FROM subcategories WHERE tag IN ({_SEARCH_TAG_LIST})",
+)
+# bm25() is lower for better matches, so ascending order is best first
+SEARCH_SQL = (
+    "SELECT url, page_title, parent_page, content, "
+    "snippet(search_index, 0, ?, ?, '…', ?) "
+    "FROM search_index WHERE search_index MATCH ? ORDER BY bm25(search_index) LIMIT ?"
+)
+SEARCH_SNIPPET_TOKENS = int(os.environ.get('SEARCH_SNIPPET_TOKENS', '24'))
+# Wrapped around matched terms in snippets: readable as plain text, and the
+# chat page renders the enclosed words as highlights
+SEARCH_HIGHLIGHT = ('«', '»')
+# Candidates fetched per result, since the same paragraph is often stored under several tags
+SEARCH_OVERFETCH = 8
+_SEARCH_TERM = re.compile(r'\w+')
+# Words too common to say anything about which passage fits: English function
+# words plus the filler of chat questions ("can you tell me ..."). Dropped
+# before building a MATCH query, where every remaining term is OR-ed.
+SEARCH_STOPWORDS = frozenset("""
+    a about above after again against all am an and any are as at be because been before being below
+    between both but by can could did do does doing down during each few for from further had has have
+    having he her here hers herself him himself his how i if in into is it its itself just me more most
+    my myself no nor not now of off on once only or other our ours ourselves out over own same she
+    should so some such than that the their theirs them themselves then there these they this those
+    through to too under until up very was we were what when where which while who whom why will with
+    would you your yours yourself yourselves
+    also anything else find give help hi hello info information know let like looking many much need
+    please show something tell thanks thank want wanted get got us s t ll re ve d m
+""".split())
+
+CONTACT_PAGE_TITLE = 'contact us'
+CONTACT_TAG = 'p'
+
+# Set by init_db(); False when this SQLite build lacks FTS5
+SEARCH_AVAILABLE = None
+
+
+class ConnectionPool:
+    """A bounded pool of configured connections to one database, shared by every thread.
+
+    Connections are opened on demand up to ``max_size`` and lent to one
+    thread at a time, so the short-lived threads Werkzeug starts per request
+    (and the /chat/batch workers) reuse them instead of each opening a new
+    connection and running CONNECTION_PRAGMAS again.
+    """
+
+    def __init__(self, path, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.path = path
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=5, cached_statements=256, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        """Borrow a connection, opening one if the pool isn't full yet."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.max_size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except BaseException:
+                with self._lock:
+                    self._opened -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No database connection free after {self.timeout}s ({self.max_size} in use)") from None
+
+    def release(self, conn):
+        """Return a borrowed connection, discarding it if it can't be reset."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            discard = self._closed
+        except sqlite3.Error:
+            discard = True
+        if discard:
+            with self._lock:
+                self._opened -= 1
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close the idle connections now and borrowed ones as they are returned."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._opened -= 1
+            conn.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the connection pool for DB_PATH, replacing it if DB_PATH changed."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.path != DB_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.path != DB_PATH:
+                if _pool is not None:
+                    _pool.close()
+                _pool = ConnectionPool(DB_PATH)
+            pool = _pool
+    return pool
+
+def connection():
+    """Borrow a pooled connection for the duration of a ``with`` block."""
+    return get_pool().connection()
+
+@contextmanager
+def transaction():
+    """Borrow a pooled connection and run the ``with`` block as one transaction."""
+    with connection() as conn:
+        with conn:
+            yield conn
+
 def init_db():
-    """Initialize the SQLite database for contact info only."""
-    try:
-        conn = sqlite3.connect('website_map.db')
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS website_content (
-                page_title TEXT,
-                url TEXT,
-                tag TEXT,
-                content TEXT,
-                PRIMARY KEY (page_title, tag, content)
-            )
-        ''')
-        conn.commit()
+    """Initialize the SQLite database for pre-extracted page content."""
+    try:
+        with transaction() as conn:
+            # Every worker process runs this at import; the write lock makes the
+            # column checks and ALTERs below atomic across them.
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS website_content (
+                    page_title TEXT,
+                    url TEXT,
+                    tag TEXT,
+                    content TEXT,
+                    PRIMARY KEY (page_title, tag, content)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS subcategories (
+                    parent_page TEXT,
+                    sub_title TEXT,
+                    url TEXT,
+                    tag TEXT,
+                    content TEXT,
+                    PRIMARY KEY (parent_page, sub_title, tag, content)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    page_title TEXT,
+                    parent_page TEXT,
+                    ingested_at REAL
+                )
+            ''')
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(pages)")}
+            for column, column_type in CRAWL_COLUMNS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE pages ADD COLUMN {column} {column_type}")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_url TEXT,
+                    last_title TEXT,
+                    last_intent TEXT,
+                    last_keywords TEXT,
+                    updated_at REAL
+                )
+            ''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_website_content_title_tag ON website_content (page_title, tag)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_subcategories_title_tag ON subcategories (sub_title, tag)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_title ON pages (page_title, parent_page)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_subcategories_url ON subcategories (url)")
+        with connection() as conn:
+            _init_search_index(conn)
         logging.debug("Database initialized successfully.")
     except sqlite3.Error as e:
-        logging.error(f"Error initializing database: {e}")
+        logging.error("Error initializing database: %s", e)
         raise
-    finally:
-        conn.close()
+
+def _init_search_index(conn):
+    """Create the full-text index and its triggers, backfilling it from existing content."""
+    global SEARCH_AVAILABLE
+    try:
+        with conn:
+            # Under the write lock, so exactly one worker process sees the table
+            # missing and backfills it
+            conn.execute('BEGIN IMMEDIATE')
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'").fetchone()
+            conn.execute(SEARCH_TABLE_SQL)
+            triggers = dict(conn.execute(SELECT_SEARCH_TRIGGERS_SQL).fetchall())
+            # Missing or outdated triggers (e.g. ones that indexed every tag)
+            # mean the index itself may be stale, so it is rebuilt as well
+            if not exists or set(triggers.values()) != set(SEARCH_TRIGGERS_SQL):
+                for name in triggers:
+                    conn.execute(f"DROP TRIGGER {name}")
+                for trigger in SEARCH_TRIGGERS_SQL:
+                    conn.execute(trigger)
+                for statement in REBUILD_SEARCH_SQL:
+                    conn.execute(statement)
+        SEARCH_AVAILABLE = True
+    except sqlite3.OperationalError as e:
+        if 'no such module: fts5' not in str(e):
+            logging.error("Error initializing full-text index: %s", e)
+            return
+        # SQLite builds without FTS5 still serve everything else
+        SEARCH_AVAILABLE = False
+        logging.warning("Full-text search unavailable: %s", e)
+
+def rebuild_search_index():
+    """Re-index every stored snippet, e.g. after a VACUUM renumbered rowids."""
+    try:
+        with transaction() as conn:
+            for statement in REBUILD_SEARCH_SQL:
+                conn.execute(statement)
+            conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+        logging.debug("Rebuilt the full-text index.")
+    except sqlite3.Error as e:
+        logging.error("Error rebuilding full-text index: %s", e)
+        raise
+
+def build_match_query(words):
+    """Turn free-text words into an FTS5 query matching any content word (BM25 favours pages matching more)."""
+    terms = []
+    for word in words:
+        for term in _SEARCH_TERM.findall(word.lower()):
+            if term not in terms and term not in SEARCH_STOPWORDS:
+                terms.append(term)
+    return ' OR '.join(f'"{term}"' for term in terms)
+
+def search_content(words, limit=3, highlight=SEARCH_HIGHLIGHT):
+    """Return the best-matching snippets for free-text words, best first.
+
+    Each result is ``(url, page_title, parent_page, snippet)`` where the
+    snippet is an excerpt with the matched terms wrapped in ``highlight``.
+    At most one result is returned per page, and a paragraph repeated across
+    pages (a site-wide call to action, the footer address) is quoted once.
+    """
+    query = build_match_query(words)
+    if not query or SEARCH_AVAILABLE is False:
+        return []
+    try:
+        with connection() as conn:
+            rows = conn.execute(
+                SEARCH_SQL, (highlight[0], highlight[1], SEARCH_SNIPPET_TOKENS, query, limit * SEARCH_OVERFETCH)
+            ).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error searching content for %s: %s", query, e)
+        return []
+    results = []
+    seen_pages = set()
+    seen_content = set()
+    for url, page_title, parent_page, content, snippet in rows:
+        if (url, page_title) in seen_pages or content in seen_content:
+            continue
+        seen_pages.add((url, page_title))
+        seen_content.add(content)
+        results.append((url, page_title, parent_page, snippet))
+        if len(results) == limit:
+            break
+    return results
 
 def store_contact_info(content):
-    """Store contact info in the database."""
-    try:
-        conn = sqlite3.connect('website_map.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT OR IGNORE INTO website_content (page_title, url, tag, content) VALUES (?, ?, ?, ?)",
-            ('contact us', 'https://stolmeierlaw.com/', 'p', content)
-        )
-        conn.commit()
+    """Store contact info in the database, replacing any previous copy."""
+    try:
+        with transaction() as conn:
+            conn.execute(DELETE_CONTENT_SQL, (CONTACT_PAGE_TITLE, CONTACT_TAG))
+            conn.execute(INSERT_CONTENT_SQL, (CONTACT_PAGE_TITLE, 'https://stolmeierlaw.com/', CONTACT_TAG, content))
         logging.debug("Stored contact info.")
     except sqlite3.Error as e:
-        logging.error(f"Error storing contact info: {e}")
+        logging.error("Error storing contact info: %s", e)
         raise
-    finally:
-        conn.close()
 
 def get_contact_info():
     """Retrieve contact information from the database."""
     try:
-        conn = sqlite3.connect('website_map.db')
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT content FROM website_content WHERE page_title = ? AND content LIKE '%contact%' OR content LIKE '%phone%' OR content LIKE '%email%' OR content LIKE '%address%'",
-            ('contact us',)
-        )
-        contact_text = ' '.join([row[0] for row in cursor.fetchall()])
+        with connection() as conn:
+            rows = conn.execute(SELECT_CONTACT_SQL, (CONTACT_PAGE_TITLE, CONTACT_TAG)).fetchall()
+        contact_text = ' '.join([row[0] for row in rows])
         return contact_text if contact_text else None
     except sqlite3.Error as e:
-        logging.error(f"Error retrieving contact info: {e}")
+        logging.error("Error retrieving contact info: %s", e)
+        return None
+
+def _write_pages(conn, pages):
+    """Write pre-extracted snippets within the caller's transaction; returns (snippets, pages) counts."""
+    now = time.time()
+    deletes, inserts, sub_deletes, sub_inserts, ingested = [], [], [], [], []
+    for page_title, url, parent_page, snippets_by_tag in pages:
+        for tag, snippets in snippets_by_tag.items():
+            if parent_page:
+                sub_deletes.append((parent_page, page_title, tag))
+                sub_inserts.extend((parent_page, page_title, url, tag, text) for text in snippets)
+            else:
+                deletes.append((page_title, tag))
+                inserts.extend((page_title, url, tag, text) for text in snippets)
+        ingested.append((url, page_title, parent_page, now))
+    conn.executemany(DELETE_CONTENT_SQL, deletes)
+    conn.executemany(INSERT_CONTENT_SQL, inserts)
+    conn.executemany(DELETE_SUBCATEGORY_SQL, sub_deletes)
+    conn.executemany(INSERT_SUBCATEGORY_SQL, sub_inserts)
+    conn.executemany(MARK_INGESTED_SQL, ingested)
+    return len(inserts) + len(sub_inserts), len(ingested)
+
+def store_pages(pages):
+    """Replace the pre-extracted snippets of many pages in one transaction.
+
+    ``pages`` is an iterable of ``(page_title, url, parent_page, {tag: snippets})``.
+    Every page is also marked as ingested. Rows are written with executemany.
+    """
+    try:
+        with transaction() as conn:
+            snippets, count = _write_pages(conn, pages)
+        logging.debug("Stored %s snippets for %s pages.", snippets, count)
+    except sqlite3.Error as e:
+        logging.error("Error storing page content: %s", e)
+        raise
+
+def store_crawl(pages, states, gone=()):
+    """Record a crawl in one transaction.
+
+    ``pages`` are the re-extracted pages, as for store_pages(). ``states`` are
+    ``(url, page_title, parent_page, discovered, lastmod, etag, last_modified,
+    content_hash, links_json, crawled_at)`` rows for every page crawled.
+    Discovered pages listed in ``gone`` are dropped with their snippets.
+    """
+    try:
+        with transaction() as conn:
+            # Clear by URL first so a page whose title changed leaves no stale rows behind
+            conn.executemany(DELETE_PAGE_SUBCATEGORIES_SQL, [(url,) for _, url, parent_page, _ in pages if parent_page])
+            snippets, count = _write_pages(conn, pages)
+            conn.executemany(SAVE_CRAWL_STATE_SQL, states)
+            conn.executemany(DELETE_PAGE_SUBCATEGORIES_SQL, [(url,) for url in gone])
+            conn.executemany(DELETE_PAGE_SQL, [(url,) for url in gone])
+        logging.debug("Stored %s snippets for %s changed pages; %s pages crawled, %s gone.",
+                      snippets, count, len(states), len(gone))
+    except sqlite3.Error as e:
+        logging.error("Error storing crawl results: %s", e)
+        raise
+
+def get_crawl_state():
+    """Return {url: (lastmod, etag, last_modified, content_hash, links_json, page_title, parent_page)} from the last crawl."""
+    try:
+        with connection() as conn:
+            rows = conn.execute(SELECT_CRAWL_STATE_SQL).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error retrieving crawl state: %s", e)
+        return {}
+    return {row[0]: row[1:] for row in rows}
+
+def get_discovered_pages():
+    """Return (url, page_title, parent_page) for pages the crawler found beyond the built-in map."""
+    try:
+        with connection() as conn:
+            return conn.execute(SELECT_DISCOVERED_SQL).fetchall()
+    except sqlite3.Error as e:
+        logging.error("Error retrieving discovered pages: %s", e)
+        return []
+
+def get_ingested_urls():
+    """Return the set of URLs whose content has been pre-extracted into the database."""
+    try:
+        with connection() as conn:
+            return {row[0] for row in conn.execute(SELECT_INGESTED_URLS_SQL)}
+    except sqlite3.Error as e:
+        logging.error("Error retrieving ingested pages: %s", e)
+        return set()
+
+def get_page_content(page_title, tag, parent_page=None):
+    """Return the pre-extracted snippets for a page and tag.
+
+    Returns None when the page has not been ingested (so callers should scrape
+    it live) and an empty list when it was ingested but has nothing for the tag.
+    """
+    try:
+        with connection() as conn:
+            if not conn.execute(SELECT_INGESTED_SQL, (page_title, parent_page)).fetchone():
+                return None
+            if parent_page:
+                rows = conn.execute(SELECT_SUBCATEGORY_SQL, (page_title, tag, parent_page)).fetchall()
+            else:
+                rows = conn.execute(SELECT_CONTENT_SQL, (page_title, tag)).fetchall()
+        return [row[0] for row in rows]
+    except sqlite3.Error as e:
+        logging.error("Error retrieving content for %s: %s", page_title, e)
         return None
-    finally:
-        conn.close()
\ No newline at end of file
@@ -0,0 +1,227 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from metrics import stage, STAGE_SECONDS
+try:
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.support.ui import WebDriverWait
+    from webdriver_manager.chrome import ChromeDriverManager
+except ImportError as e:
+    logging.error("Selenium import failed: %s", e)
+    raise
+
+logging.basicConfig(level=logging.DEBUG)
+
+# Pool sizing (override through the environment to tune for the host)
+POOL_SIZE = int(os.environ.get('SCRAPER_POOL_SIZE', '2'))
+POOL_WAIT_TIMEOUT = float(os.environ.get('SCRAPER_POOL_WAIT_TIMEOUT', '10'))
+DRIVER_MAX_USES = int(os.environ.get('SCRAPER_DRIVER_MAX_USES', '50'))
+PAGE_LOAD_TIMEOUT = float(os.environ.get('SCRAPER_PAGE_LOAD_TIMEOUT', '10'))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'
+
+
+class PoolTimeout(Exception):
+    """Raised when no driver becomes available within the wait timeout."""
+
+
+class _PooledDriver:
+    """A WebDriver plus the bookkeeping the pool needs to recycle it."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class DriverPool:
+    """A bounded pool of headless Chrome drivers shared across requests.
+
+    Drivers are created lazily up to ``size``, borrowed for one page load and
+    returned afterwards. A driver that fails its health check or has served
+    ``max_uses`` page loads is quit and replaced on the next borrow.
+    """
+
+    def __init__(self, size=POOL_SIZE, wait_timeout=POOL_WAIT_TIMEOUT, max_uses=DRIVER_MAX_USES):
+        self.size = size
+        self.wait_timeout = wait_timeout
+        self.max_uses = max_uses
+        # Idle drivers (most recently returned last) and the live count are
+        # guarded by this condition, which is notified whenever a driver is
+        # returned or a slot frees up, so waiters never sleep past a free slot.
+        self._idle = []
+        self._available = threading.Condition()
+        self._lock = threading.Lock()
+        self._driver_path = None
+        self._created = 0
+        self._live = 0
+        self._in_use = 0
+        self._recycled = 0
+        self._borrows = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._timeouts = 0
+        self._closed = False
+
+    def resolve_driver(self):
+        """Resolve the chromedriver binary once; later calls reuse the path."""
+        with self._lock:
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()
+                logging.debug("Resolved chromedriver at %s", self._driver_path)
+            return self._driver_path
+
+    def _create_driver(self):
+        options = Options()
+        options.add_argument('--headless')
+        options.add_argument('--disable-gpu')
+        options.add_argument(f'user-agent={USER_AGENT}')
+        with stage('browser.start'):
+            service = Service(self.resolve_driver())
+            driver = webdriver.Chrome(service=service, options=options)
+            driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        with self._lock:
+            self._created += 1
+        return _PooledDriver(driver)
+
+    @staticmethod
+    def _is_healthy(pooled):
+        try:
+            pooled.driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logging.warning("Error quitting driver: %s", e)
+        with self._available:
+            self._live -= 1
+            self._available.notify()
+
+    def _reserve(self, deadline):
+        """Wait for an idle driver or a free slot; returns the driver, or None for a slot."""
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._live < self.size:
+                    self._live += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeout(f"No browser available after {self.wait_timeout}s")
+                self._available.wait(remaining)
+
+    def acquire(self):
+        """Borrow a driver, creating one if the pool has spare capacity."""
+        started = time.monotonic()
+        deadline = started + self.wait_timeout
+        while True:
+            pooled = self._reserve(deadline)
+            if pooled is None:
+                try:
+                    pooled = self._create_driver()
+                except Exception:
+                    with self._available:
+                        self._live -= 1
+                        self._available.notify()
+                    raise
+                break
+            if self._is_healthy(pooled):
+                break
+            logging.warning("Discarding unhealthy driver from pool.")
+            self._discard(pooled)
+            with self._lock:
+                self._recycled += 1
+
+        waited = time.monotonic() - started
+        STAGE_SECONDS.observe(waited, stage='browser.pool_wait')
+        with self._lock:
+            self._borrows += 1
+            self._in_use += 1
+            self._wait_seconds_total += waited
+            self._wait_seconds_max = max(self._wait_seconds_max, waited)
+        return pooled
+
+    def release(self, pooled, broken=False):
+        """Return a borrowed driver, recycling it if it is worn out or broken."""
+        pooled.uses += 1
+        with self._lock:
+            self._in_use -= 1
+        if broken or self._closed or pooled.uses >= self.max_uses:
+            self._discard(pooled)
+            with self._lock:
+                self._recycled += 1
+            return
+        with self._available:
+            self._idle.append(pooled)
+            self._available.notify()
+
+    def fetch_html(self, url, ready_timeout=PAGE_LOAD_TIMEOUT):
+        """Load ``url`` in a pooled driver and return the rendered HTML."""
+        pooled = self.acquire()
+        broken = False
+        try:
+            pooled.driver.get(url)
+            WebDriverWait(pooled.driver, ready_timeout).until(
+                lambda d: d.execute_script('return document.readyState') == 'complete'
+            )
+            return pooled.driver.page_source
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def stats(self):
+        """Return counters useful for sizing the pool."""
+        with self._lock:
+            return {
+                'size': self.size,
+                'live': self._live,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'created': self._created,
+                'recycled': self._recycled,
+                'borrows': self._borrows,
+                'timeouts': self._timeouts,
+                'wait_seconds_total': round(self._wait_seconds_total, 4),
+                'wait_seconds_max': round(self._wait_seconds_max, 4),
+                'max_uses': self.max_uses,
+            }
+
+    def close(self):
+        """Quit every idle driver; borrowed drivers are quit when released."""
+        self._closed = True
+        with self._available:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    """Return the process-wide driver pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DriverPool()
+                atexit.register(_pool.close)
+    return _pool
+
+
+def get_pool_stats():
+    """Return driver pool statistics without creating any browsers."""
+    return get_driver_pool().stats()
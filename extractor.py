@@ -0,0 +1,135 @@
+import logging
+from scraper import fetch_page
+from page_cache import page_cache
+from metrics import stage
+
+logging.basicConfig(level=logging.DEBUG)
+
+HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4'])
+BLOCK_TAGS = frozenset(['p', 'ul', 'ol'])
+CAUSE_HEADING_WORDS = ('causes', 'reasons', 'factors')
+CONTACT_WORDS = ('phone', 'email', 'address')
+CAUSE_BLOCKS_PER_HEADING = 5
+ABOUT_PARAGRAPHS_PER_HEADING = 3
+DESCRIPTION_PARAGRAPHS = 3
+MIN_PARAGRAPH_WORDS = 5
+
+_SECTIONS_KEY = 'sections'
+
+
+class PageSections:
+    """Every intent's snippets for one page, extracted in a single pass."""
+
+    __slots__ = ('url', 'causes', 'about', 'contact', 'description')
+
+    def __init__(self, url, causes, about, contact, description):
+        self.url = url
+        self.causes = causes
+        self.about = about
+        self.contact = contact
+        self.description = description
+
+    def get(self, intent):
+        """Return the snippets for an intent; unknown intents get the description."""
+        if intent in ('causes', 'about', 'contact'):
+            return getattr(self, intent)
+        return self.description
+
+    def as_dict(self):
+        return {'causes': self.causes, 'about': self.about, 'contact': self.contact, 'description': self.description}
+
+
+def _is_meaningful(text):
+    return bool(text) and len(text.split()) > MIN_PARAGRAPH_WORDS
+
+
+def extract_sections(soup, url=None):
+    """Walk the parsed page once and build every intent's snippets together.
+
+    One document-order pass records the headings, the p/ul/ol blocks and the
+    position of each heading among them, so "the N blocks after a heading" is
+    a slice instead of a fresh find_all_next() per heading.
+    """
+    headings = []        # (tag, index into blocks, index into paragraphs)
+    blocks = []
+    paragraphs = []
+    footer = None
+    contact_div = None
+    texts = {}
+
+    def text_of(tag):
+        key = id(tag)
+        if key not in texts:
+            texts[key] = tag.get_text(strip=True)
+        return texts[key]
+
+    for tag in soup.find_all(True):
+        name = tag.name
+        if name in HEADING_TAGS:
+            headings.append((tag, len(blocks), len(paragraphs)))
+        elif name in BLOCK_TAGS:
+            blocks.append(tag)
+            if name == 'p':
+                paragraphs.append(tag)
+        elif name == 'footer':
+            if footer is None:
+                footer = tag
+        elif name == 'div' and contact_div is None:
+            classes = tag.get('class') or []
+            if any('contact' in value.lower() for value in classes):
+                contact_div = tag
+
+    causes = []
+    about = []
+    for heading, block_start, paragraph_start in headings:
+        heading_text = heading.string
+        if not heading_text:
+            continue
+        heading_text = heading_text.lower()
+        if any(word in heading_text for word in CAUSE_HEADING_WORDS):
+            for elem in blocks[block_start:block_start + CAUSE_BLOCKS_PER_HEADING]:
+                if elem.name == 'p':
+                    if _is_meaningful(text_of(elem)):
+                        causes.append(text_of(elem))
+                else:
+                    for li in elem.find_all('li'):
+                        if text_of(li):
+                            causes.append(text_of(li))
+        if 'about' in heading_text:
+            for elem in paragraphs[paragraph_start:paragraph_start + ABOUT_PARAGRAPHS_PER_HEADING]:
+                if _is_meaningful(text_of(elem)):
+                    about.append(text_of(elem))
+
+    description = [text_of(p) for p in paragraphs[:DESCRIPTION_PARAGRAPHS] if _is_meaningful(text_of(p))]
+    if not about:
+        about = list(description)
+
+    contact = []
+    container = footer or contact_div
+    if container:
+        for elem in container.find_all(['p', 'div']):
+            string = elem.string
+            if string and any(word in string.lower() for word in CONTACT_WORDS) and text_of(elem):
+                contact.append(text_of(elem))
+
+    return PageSections(url, causes, about, contact, description)
+
+
+def get_page_sections(url):
+    """Fetch (or reuse) a page and return its PageSections, cached alongside the page.
+
+    Returns None when the page can't be fetched.
+    """
+    soup = fetch_page(url)
+    if not soup:
+        return None
+    entry = page_cache.peek(url)
+    if entry is not None and entry.soup is soup:
+        sections = entry.extras.get(_SECTIONS_KEY)
+        if sections is None:
+            with stage('extract.sections'):
+                sections = extract_sections(soup, url)
+            entry.extras[_SECTIONS_KEY] = sections
+        return sections
+    with stage('extract.sections'):
+        return extract_sections(soup, url)
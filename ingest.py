@@ -0,0 +1,51 @@
+"""Pre-extract answers for every page in the website map into website_map.db.
+
+Run this offline (e.g. from cron) so /chat and /scrape_page can answer from
+SQLite instead of scraping on the request path:
+
+    python ingest.py
+"""
+import logging
+import sys
+from scraper import build_website_map, scrape_contact_info_fallback, is_contact_info, iter_pages
+from extractor import get_page_sections
+from database import init_db, store_pages, store_contact_info
+
+logging.basicConfig(level=logging.DEBUG)
+
+def extract_page(page_title, url, parent_page=None):
+    """Fetch one page and extract the snippets for every intent.
+
+    Returns a row for database.store_pages, or None if the page couldn't be fetched.
+    """
+    sections = get_page_sections(url)
+    if sections is None:
+        logging.error("Skipping %s: could not fetch %s.", page_title, url)
+        return None
+    return page_title, url, parent_page, sections.as_dict()
+
+def run_ingest(website_map=None):
+    """Ingest every page in the website map. Returns (ingested, failed) counts."""
+    init_db()
+    website_map = website_map or build_website_map()
+    rows = []
+    failed = 0
+    for page_title, url, parent_page in iter_pages(website_map):
+        row = extract_page(page_title, url, parent_page)
+        if row:
+            rows.append(row)
+        else:
+            failed += 1
+    # One transaction for the whole site so readers never see a half-written ingest
+    store_pages(rows)
+
+    contact_text = scrape_contact_info_fallback()
+    if is_contact_info(contact_text):
+        store_contact_info(contact_text)
+
+    logging.info("Ingest finished: %s pages stored, %s failed.", len(rows), failed)
+    return len(rows), failed
+
+if __name__ == '__main__':
+    _, failed = run_ingest()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,102 @@
+import logging
+from collections import defaultdict
+from rapidfuzz import fuzz
+from rapidfuzz.utils import default_process
+
+logging.basicConfig(level=logging.DEBUG)
+
+MATCH_THRESHOLD = 80
+MAX_PHRASE_WORDS = 3
+
+
+def token_sort_key(text):
+    """Normalize text the way token_sort_ratio does: processed, tokens sorted."""
+    return ' '.join(sorted(default_process(text).split()))
+
+
+def _trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def candidate_phrases(keywords, max_words=MAX_PHRASE_WORDS):
+    """Return contiguous keyword phrases, longest first, e.g. 'car accident' before 'car'."""
+    phrases = []
+    for size in range(min(max_words, len(keywords)), 0, -1):
+        for start in range(len(keywords) - size + 1):
+            phrases.append(' '.join(keywords[start:start + size]))
+    return phrases
+
+
+class SectionMatcher:
+    """Fuzzy-match user keywords against section titles.
+
+    Section titles are normalized and indexed by character trigram once, so a
+    message only scores its phrases against sections sharing a trigram with
+    one of their words, and each comparison stops as soon as it can't beat the
+    threshold. Scores match ``thefuzz.fuzz.token_sort_ratio``.
+    """
+
+    def __init__(self, choices, threshold=MATCH_THRESHOLD):
+        self.choices = tuple(choices)
+        self.threshold = threshold
+        self._keys = tuple(token_sort_key(choice) for choice in self.choices)
+        self._lengths = tuple(len(key) for key in self._keys)
+        self._trigram_index = defaultdict(set)
+        for position, key in enumerate(self._keys):
+            for gram in _trigrams(key):
+                self._trigram_index[gram].add(position)
+
+    def _candidates(self, token):
+        positions = set()
+        for gram in _trigrams(token):
+            positions |= self._trigram_index.get(gram, set())
+        return positions
+
+    def score_all(self, keywords, max_words=MAX_PHRASE_WORDS):
+        """Score every keyword phrase against every plausible section in one pass.
+
+        Trigram candidates are looked up once per token and unioned per phrase.
+        Returns a list of (phrase, choice, score) for pairs scoring above the
+        threshold, longest and earliest phrases first.
+        """
+        tokens = [default_process(keyword) for keyword in keywords]
+        tokens = [token for token in tokens if token]
+        token_candidates = [self._candidates(token) for token in tokens]
+        keys = self._keys
+        threshold = self.threshold
+        # A phrase of length n can only pass against sections of length
+        # n*t/(200-t) < m < n*(200-t)/t, since ratio <= 200*min(n, m)/(n+m).
+        low_factor = threshold / (200 - threshold)
+        high_factor = (200 - threshold) / threshold
+        matches = []
+        seen = set()
+        for size in range(min(max_words, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                words = tokens[start:start + size]
+                key = ' '.join(sorted(' '.join(words).split()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                low, high = len(key) * low_factor, len(key) * high_factor
+                positions = set().union(*token_candidates[start:start + size])
+                for position in sorted(positions):
+                    if not low < self._lengths[position] < high:
+                        continue
+                    score = round(fuzz.ratio(key, keys[position], score_cutoff=threshold))
+                    if score > threshold:
+                        matches.append((' '.join(words), self.choices[position], score))
+        return matches
+
+    def best_match(self, keywords):
+        """Return (choice, score) for the best phrase/section pair, or None.
+
+        Ties go to the longer, earlier phrase.
+        """
+        best = None
+        for phrase, choice, score in self.score_all(keywords):
+            if best is None or score > best[1]:
+                best = (choice, score)
+                if score == 100:
+                    break
+        return best
@@ -1,103 +1,234 @@
-import nltk
+import time
+_import_started = time.perf_counter()
+
 import logging
-from scraper import fetch_page
+import os
+import re
+import threading
+from extractor import get_page_sections
+from database import get_page_content
+from routing import index_for
+from sessions import Session
+from metrics import stage
 
 logging.basicConfig(level=logging.DEBUG)
 
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('wordnet', quiet=True)
-except Exception as e:
-    logging.error(f"Error downloading NLTK data: {e}")
-    raise
+# 'nltk' uses NLTK's punkt-based word_tokenize (falling back to 'regex' when the
+# punkt data isn't installed); 'regex' never imports NLTK at all.
+NLP_TOKENIZER = os.environ.get('NLP_TOKENIZER', 'nltk')
+NLTK_DATA_DIR = os.environ.get('NLTK_DATA', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data'))
+# Only download missing NLTK data when explicitly allowed (needs network access)
+NLTK_AUTO_DOWNLOAD = os.environ.get('NLTK_AUTO_DOWNLOAD', '0') == '1'
+
+STOPWORDS = frozenset(['what', 'are', 'the', 'of', 'in', 'a', 'an', 'to', 'for', 'about'])
+
+# Intent keywords in priority order; the first group listed wins when a message
+# mentions several. Matched at the start of a word, so 'causes' and 'reasons' count.
+INTENT_KEYWORDS = (
+    ('causes', ('cause', 'reason')),
+    ('about', ('about', 'who', 'what')),
+    ('contact', ('contact', 'phone', 'email', 'address')),
+)
+INTENT_PATTERN = re.compile('|'.join(
+    f"(?P<{intent}>\\b(?:{'|'.join(words)}))" for intent, words in INTENT_KEYWORDS
+))
+CONTACT_PATTERN = re.compile(r'\b(?:contact|phone|email|address)')
+_INTENT_PRIORITY = {intent: rank for rank, (intent, _) in enumerate(INTENT_KEYWORDS)}
+_REGEX_TOKEN = re.compile(r"\w+(?:'\w+)?")
+
+_tokenizer = None
+_tokenizer_name = None
+_tokenizer_load_seconds = None
+_tokenizer_lock = threading.Lock()
+
+def regex_tokenize(text):
+    """Split text into word tokens without NLTK."""
+    return _REGEX_TOKEN.findall(text)
+
+def _load_nltk_tokenizer():
+    """Import NLTK and check punkt is available locally; returns word_tokenize or None."""
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        if not NLTK_AUTO_DOWNLOAD:
+            logging.warning("NLTK punkt data not found (looked in %s); using the regex tokenizer.", NLTK_DATA_DIR)
+            return None
+        try:
+            if not nltk.download('punkt', download_dir=NLTK_DATA_DIR, quiet=True):
+                raise LookupError('punkt download failed')
+        except Exception as e:
+            logging.error("Error downloading NLTK data: %s", e)
+            return None
+    return nltk.word_tokenize
+
+def get_tokenizer():
+    """Return the configured tokenizer, loading it on first use."""
+    global _tokenizer, _tokenizer_name, _tokenizer_load_seconds
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                started = time.perf_counter()
+                tokenizer = _load_nltk_tokenizer() if NLP_TOKENIZER == 'nltk' else None
+                _tokenizer_name = 'nltk' if tokenizer else 'regex'
+                _tokenizer_load_seconds = time.perf_counter() - started
+                _tokenizer = tokenizer or regex_tokenize
+                logging.debug("Loaded %s tokenizer in %.1f ms.", _tokenizer_name, _tokenizer_load_seconds * 1000)
+    return _tokenizer
 
-def extract_keywords_and_intent(user_message, session_id, website_map, user_sessions):
+def detect_intent(text):
+    """Return the highest-priority intent mentioned in text, scanning it once."""
+    best = None
+    for match in INTENT_PATTERN.finditer(text):
+        if best is None or _INTENT_PRIORITY[match.lastgroup] < _INTENT_PRIORITY[best]:
+            best = match.lastgroup
+            if _INTENT_PRIORITY[best] == 0:
+                break
+    return best or 'description'
+
+def mentions_contact(text):
+    """True if text asks for contact details (phone, email, address...)."""
+    return CONTACT_PATTERN.search(text.lower()) is not None
+
+# Words that may accompany an intent keyword in a follow-up about the last
+# page shown ("what are the main causes?", "tell me more about it").
+FOLLOW_UP_WORDS = frozenset([
+    'is', 'are', 'was', 'were', 'it', 'its', "it's", 'this', 'that', 'these', 'those', 'they', 'them',
+    'their', 'there', 'the', 'a', 'an', 'of', 'for', 'in', 'on', 'to', 'and', 'or', 'some', 'any',
+    'other', 'more', 'most', 'main', 'common', 'usual', 'typical', 'major', 'tell', 'me', 'give',
+    'list', 'show',
+])
+_CONTENT_WORD = re.compile(r'\w')
+
+def is_follow_up(keywords):
+    """True if the keywords ask for an intent but name no subject, e.g. "what are the causes?"."""
+    asks_intent = False
+    for word in keywords:
+        if INTENT_PATTERN.match(word):
+            asks_intent = True
+        elif _CONTENT_WORD.search(word) and word not in FOLLOW_UP_WORDS:
+            return False
+    return asks_intent
+
+def follow_up_url(keywords, session, routing):
+    """Return the URL a follow-up message refers to (the visitor's last page), or None."""
+    if session is None or not session.last_url:
+        return None
+    with stage('nlp.follow_up'):
+        if not is_follow_up(keywords) or routing.title_for_url(session.last_url) is None:
+            return None
+    return session.last_url
+
+def extract_keywords_and_intent(user_message, session_id):
     """Extract keywords and intent from the user message."""
-    tokens = nltk.word_tokenize(user_message.lower())
-    keywords = [token for token in tokens if token not in ['what', 'are', 'the', 'of', 'in', 'a', 'an', 'to', 'for', 'about']]
-    
-    # Simple intent detection
-    intent = 'description'
-    if any(word in user_message.lower() for word in ['cause', 'causes', 'reason', 'reasons']):
-        intent = 'causes'
-    elif any(word in user_message.lower() for word in ['about', 'who', 'what']):
-        intent = 'about'
-    elif any(word in user_message.lower() for word in ['contact', 'phone', 'email', 'address']):
-        intent = 'contact'
-    
-    logging.debug(f"Session {session_id}: Extracted keywords: {keywords}, Intent: {intent}")
+    message = user_message.lower()
+    with stage('nlp.tokenize'):
+        tokens = get_tokenizer()(message)
+        keywords = [token for token in tokens if token not in STOPWORDS]
+    with stage('nlp.intent'):
+        intent = detect_intent(message)
+    logging.debug("Session %s: Extracted keywords: %s, Intent: %s", session_id, keywords, intent)
     return keywords, intent
 
-def scrape_targeted_content(keywords, intent, session_id, url, website_map, user_sessions):
-    """Scrape targeted content from the given URL based on keywords and intent."""
-    logging.debug(f"Scraping content from {url} for keywords: {keywords}, intent: {intent}")
+def get_nlp_stats():
+    """Return import and tokenizer load timings (seconds) for tracking startup cost."""
+    return {
+        'import_seconds': round(IMPORT_SECONDS, 4),
+        'tokenizer': _tokenizer_name,
+        'tokenizer_load_seconds': None if _tokenizer_load_seconds is None else round(_tokenizer_load_seconds, 4),
+    }
+
+INTENTS = ('causes', 'about', 'contact', 'description')
 
-    # Fetch the page content
-    soup = fetch_page(url)
-    if not soup:
-        return "Sorry, I couldn’t fetch the content for this section."
+NOT_FOUND_MESSAGES = {
+    'causes': "Sorry, I couldn’t find specific information about causes for this section.",
+    'about': "Sorry, I couldn’t find specific information about this section.",
+    'contact': "Sorry, I couldn’t find contact information on the website.",
+    'description': "Sorry, I couldn’t find specific information about this section.",
+}
 
-    # Determine the type of content to scrape based on intent
+def format_snippets(snippets, intent):
+    """Join extracted snippets into the reply text for an intent."""
+    if not snippets:
+        return NOT_FOUND_MESSAGES.get(intent, NOT_FOUND_MESSAGES['description'])
     if intent == 'causes':
-        # Look for sections that might contain causes (e.g., headings with "causes", "reasons", or lists)
-        content = []
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4'], string=lambda text: text and any(kw in text.lower() for kw in ['causes', 'reasons', 'factors'])):
-            # Extract paragraphs or lists following the heading
-            next_elements = heading.find_all_next(['p', 'ul', 'ol'], limit=5)
-            for elem in next_elements:
-                if elem.name == 'p':
-                    text = elem.get_text(strip=True)
-                    if text and len(text.split()) > 5:  # Ensure it's a meaningful paragraph
-                        content.append(f"- {text}")
-                elif elem.name in ['ul', 'ol']:
-                    for li in elem.find_all('li'):
-                        text = li.get_text(strip=True)
-                        if text:
-                            content.append(f"- {text}")
-        if content:
-            return "\n".join(content)
-        return "Sorry, I couldn’t find specific information about causes for this section."
-
-    elif intent == 'about':
-        # Look for "About" sections or general descriptive paragraphs
-        content = []
-        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4'], string=lambda text: text and 'about' in text.lower()):
-            next_elements = heading.find_all_next(['p'], limit=3)
-            for elem in next_elements:
-                text = elem.get_text(strip=True)
-                if text and len(text.split()) > 5:
-                    content.append(text)
-        if content:
-            return "\n\n".join(content)
-        # Fallback: Extract the first few meaningful paragraphs
-        for p in soup.find_all('p', limit=3):
-            text = p.get_text(strip=True)
-            if text and len(text.split()) > 5:
-                content.append(text)
-        if content:
-            return "\n\n".join(content)
-        return "Sorry, I couldn’t find specific information about this section."
-
-    elif intent == 'contact':
-        # Look for contact information in the footer or contact section
-        contact_info = []
-        footer = soup.find('footer') or soup.find('div', class_=lambda x: x and 'contact' in x.lower())
-        if footer:
-            for elem in footer.find_all(['p', 'div'], string=lambda text: text and any(keyword in text.lower() for keyword in ['phone', 'email', 'address'])):
-                text = elem.get_text(strip=True)
-                if text:
-                    contact_info.append(text)
-        if contact_info:
-            return "\n".join(contact_info)
-        return "Sorry, I couldn’t find contact information on the website."
-
-    else:
-        # Default: Extract a general description
-        content = []
-        for p in soup.find_all('p', limit=3):
-            text = p.get_text(strip=True)
-            if text and len(text.split()) > 5:
-                content.append(text)
-        if content:
-            return "\n\n".join(content)
-        return "Sorry, I couldn’t find specific information about this section."
\ No newline at end of file
+        return "\n".join(f"- {text}" for text in snippets)
+    if intent == 'contact':
+        return "\n".join(snippets)
+    return "\n\n".join(snippets)
+
+def iter_snippet_chunks(snippets, intent):
+    """Yield the reply text for an intent piece by piece; the pieces join to format_snippets()."""
+    if not snippets:
+        yield format_snippets(snippets, intent)
+        return
+    separator = "\n" if intent in ('causes', 'contact') else "\n\n"
+    for i, text in enumerate(snippets):
+        chunk = f"- {text}" if intent == 'causes' else text
+        yield chunk if i == 0 else separator + chunk
+
+def format_search_results(results):
+    """Quote full-text search hits, naming the section each one comes from."""
+    lines = [f"- {snippet} ({page_title.capitalize()})" for _, page_title, _, snippet in results]
+    return "Here’s what I found on the site:\n" + "\n".join(lines)
+
+FETCH_FAILED_MESSAGE = "Sorry, I couldn’t fetch the content for this section."
+
+def scrape_targeted_snippets(url, intent):
+    """Fetch a page and return its snippets for an intent, or None if it can't be fetched."""
+    # Every intent is extracted (and cached) together, so a follow-up question
+    # with a different intent on the same page doesn't re-walk the page.
+    with stage('content.scrape'):
+        sections = get_page_sections(url)
+    if sections is None:
+        return None
+    return sections.get(intent)
+
+def remember_page(keywords, intent, session_id, url, website_map, user_sessions):
+    """Record url as the visitor's last page in the session store; returns (page_title, parent_page)."""
+    page_title, parent_page = index_for(website_map).page_for_url(url)
+    if page_title and user_sessions is not None:
+        user_sessions.save(Session(session_id, url, page_title, intent, keywords))
+    return page_title, parent_page
+
+def scrape_targeted_content(keywords, intent, session_id, url, website_map, user_sessions):
+    """Scrape targeted content from the given URL live, skipping pre-extracted content.
+
+    The page is recorded in the session store like get_targeted_content() does,
+    so a follow-up question can refer to it.
+    """
+    logging.debug("Scraping content from %s for keywords: %s, intent: %s", url, keywords, intent)
+    remember_page(keywords, intent, session_id, url, website_map, user_sessions)
+    snippets = scrape_targeted_snippets(url, intent)
+    if snippets is None:
+        return FETCH_FAILED_MESSAGE
+    return format_snippets(snippets, intent)
+
+def get_targeted_snippets(keywords, intent, session_id, url, website_map, user_sessions):
+    """Return the snippets answering intent for url, or None if the page can't be fetched.
+
+    Pre-extracted content in the database is used when available; otherwise
+    the page is scraped live.
+    """
+    page_title, parent_page = remember_page(keywords, intent, session_id, url, website_map, user_sessions)
+    if page_title:
+        with stage('content.db_lookup'):
+            snippets = get_page_content(page_title, intent, parent_page)
+        if snippets is not None:
+            logging.debug("Serving %s for %s from the database.", intent, page_title)
+            return snippets
+    logging.debug("No pre-extracted content for %s; scraping live.", url)
+    return scrape_targeted_snippets(url, intent)
+
+def get_targeted_content(keywords, intent, session_id, url, website_map, user_sessions):
+    """Answer from pre-extracted content in the database, scraping live only as a fallback."""
+    snippets = get_targeted_snippets(keywords, intent, session_id, url, website_map, user_sessions)
+    if snippets is None:
+        return FETCH_FAILED_MESSAGE
+    return format_snippets(snippets, intent)
+
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+logging.debug("nlp imported in %.1f ms.", IMPORT_SECONDS * 1000)
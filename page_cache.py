@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logging.basicConfig(level=logging.DEBUG)
+
+CACHE_MAX_BYTES = int(os.environ.get('PAGE_CACHE_MAX_BYTES', str(128 * 1024 * 1024)))
+CACHE_TTL = float(os.environ.get('PAGE_CACHE_TTL', '3600'))
+# Approximate memory held by one parsed node (the Tag or string object, its
+# attribute dict and child list) on top of its text, measured with tracemalloc
+# on the site's pages. A parsed page is typically 20-50x its HTML.
+SOUP_NODE_BYTES = 560
+
+
+def estimate_entry_bytes(html, soup):
+    """Approximate the memory a cache entry holds.
+
+    That is the raw HTML, the parsed soup (a fixed cost per node plus its
+    text) and the values derived from it in ``extras``, whose extracted
+    snippets copy at most the page's text once more.
+    """
+    nodes = text = 0
+    if soup is not None:
+        for node in soup.descendants:
+            nodes += 1
+            if isinstance(node, str):
+                text += len(node)
+    return len(html.encode('utf-8')) + nodes * SOUP_NODE_BYTES + 2 * text
+
+
+class CacheEntry:
+    """Raw HTML, its parsed soup and the validators needed to revalidate it."""
+
+    __slots__ = ('url', 'html', 'soup', 'etag', 'last_modified', 'size', 'expires_at', 'extras')
+
+    def __init__(self, url, html, soup, etag=None, last_modified=None, ttl=CACHE_TTL):
+        self.url = url
+        self.html = html
+        self.soup = soup
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = estimate_entry_bytes(html, soup)
+        self.expires_at = time.monotonic() + ttl
+        # Values derived from the soup (e.g. extracted sections); dropped with the entry.
+        self.extras = {}
+
+    def is_fresh(self):
+        return time.monotonic() < self.expires_at
+
+    def can_revalidate(self):
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self):
+        """Headers for a conditional GET against the origin."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """A thread-safe, byte-capped LRU cache of fetched pages keyed by URL.
+
+    Sizes are the estimated memory of each entry's HTML, parsed soup and
+    extracted sections (see estimate_entry_bytes). Expired entries are kept until evicted
+    so they can be revalidated with a conditional request instead of refetched.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._revalidated = 0
+        self._evictions = 0
+
+    def get(self, url):
+        """Return the entry for ``url`` (fresh or stale) or None, recording hit/miss."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(url)
+            if entry.is_fresh():
+                self._hits += 1
+            else:
+                self._stale += 1
+            return entry
+
+    def peek(self, url):
+        """Return the entry for ``url`` without touching LRU order or counters."""
+        with self._lock:
+            return self._entries.get(url)
+
+    def put(self, url, html, soup, etag=None, last_modified=None):
+        """Store a freshly fetched page, evicting least recently used pages as needed."""
+        entry = CacheEntry(url, html, soup, etag, last_modified, self.ttl)
+        if entry.size > self.max_bytes:
+            logging.debug("Not caching %s: %s bytes exceeds cache size.", url, entry.size)
+            return entry
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[url] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._evictions += 1
+        return entry
+
+    def mark_revalidated(self, entry):
+        """Extend an entry's lifetime after the origin answered 304 Not Modified."""
+        with self._lock:
+            entry.expires_at = time.monotonic() + self.ttl
+            self._revalidated += 1
+
+    def invalidate(self, url):
+        with self._lock:
+            entry = self._entries.pop(url, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stale': self._stale,
+                'revalidated': self._revalidated,
+                'evictions': self._evictions,
+            }
+
+
+page_cache = PageCache()
+
+
+def get_cache_stats():
+    """Return hit/miss/eviction counters for the shared page cache."""
+    return page_cache.stats()
@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from scraper import fetch_page
+
+logging.basicConfig(level=logging.DEBUG)
+
+PREFETCH_CONCURRENCY = int(os.environ.get('PREFETCH_CONCURRENCY', '4'))
+PREFETCH_PER_HOST = int(os.environ.get('PREFETCH_PER_HOST', '2'))
+# Minimum seconds between two warm-up runs, so every /welcome doesn't trigger one
+PREFETCH_MIN_INTERVAL = float(os.environ.get('PREFETCH_MIN_INTERVAL', '300'))
+
+
+class Prefetcher:
+    """Warm the page cache for a set of URLs in a background thread.
+
+    At most ``concurrency`` pages are fetched at once and at most ``per_host``
+    of those from the same host. Only one run is in flight at a time and runs
+    are spaced at least ``min_interval`` seconds apart.
+    """
+
+    def __init__(self, concurrency=PREFETCH_CONCURRENCY, per_host=PREFETCH_PER_HOST,
+                 min_interval=PREFETCH_MIN_INTERVAL):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._host_limits = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self._running = False
+        self._last_started = None
+        self._runs = 0
+        self._fetched = 0
+        self._failed = 0
+        self._last_duration = None
+
+    def start(self, urls):
+        """Start warming ``urls`` in the background. Returns False if skipped.
+
+        ``urls`` may be a callable returning the URLs; it is only called, on
+        the background thread, when a run actually starts.
+        """
+        with self._lock:
+            if self._running:
+                return False
+            now = time.monotonic()
+            if self._last_started is not None and now - self._last_started < self.min_interval:
+                return False
+            self._running = True
+            self._last_started = now
+        thread = threading.Thread(target=self.run, args=(urls if callable(urls) else list(urls),),
+                                  name='prefetch', daemon=True)
+        thread.start()
+        return True
+
+    def _fetch_one(self, url):
+        with self._lock:
+            limit = self._host_limits[urlsplit(url).netloc]
+        with limit:
+            soup = fetch_page(url)
+        with self._lock:
+            if soup is None:
+                self._failed += 1
+            else:
+                self._fetched += 1
+
+    def run(self, urls):
+        """Fetch ``urls`` (or the URLs a callable returns) concurrently, blocking until all are done."""
+        started = time.monotonic()
+        try:
+            urls = list(urls() if callable(urls) else urls)
+            logging.debug("Prefetching %s pages with concurrency %s.", len(urls), self.concurrency)
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='prefetch') as executor:
+                for future in [executor.submit(self._fetch_one, url) for url in urls]:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logging.error("Prefetch failed: %s", e)
+                        with self._lock:
+                            self._failed += 1
+        finally:
+            with self._lock:
+                self._running = False
+                self._runs += 1
+                self._last_duration = time.monotonic() - started
+        logging.debug("Prefetch finished in %.2fs.", self._last_duration)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'running': self._running,
+                'runs': self._runs,
+                'fetched': self._fetched,
+                'failed': self._failed,
+                'last_duration_seconds': None if self._last_duration is None else round(self._last_duration, 3),
+                'concurrency': self.concurrency,
+                'per_host': self.per_host,
+            }
+
+
+prefetcher = Prefetcher()
+
+
+def get_prefetch_stats():
+    return prefetcher.stats()
@@ -0,0 +1,148 @@
+import logging
+import os
+import re
+import threading
+import time
+from types import MappingProxyType
+from scraper import load_website_map
+from matcher import SectionMatcher
+
+logging.basicConfig(level=logging.DEBUG)
+
+# Rebuild the index this often so pages found by the crawler start routing
+# without a restart (0 disables)
+ROUTING_REFRESH_SECONDS = float(os.environ.get('ROUTING_REFRESH_SECONDS', '600'))
+
+# Extra phrasings users type for a section, keyed by the section's map title.
+SECTION_ALIASES = {
+    'home': ['home page', 'homepage', 'main page'],
+    'practice areas': ['practice area', 'services', 'areas of practice'],
+    'recent results': ['results', 'case results', 'verdicts', 'settlements'],
+    'about': ['about us', 'the firm', 'firm'],
+    'blogs': ['blog', 'articles', 'news'],
+    'contact us': ['contact'],
+    'car accidents': ['car accident', 'auto accident', 'auto accidents', 'car crash', 'car wreck', 'vehicle accident'],
+    'personal injury': ['injury', 'injuries', 'personal injuries'],
+    'family law': ['divorce', 'custody', 'child custody'],
+    'criminal defense': ['criminal', 'criminal law', 'defense'],
+    'wrongful death': ['wrongful deaths'],
+    'medical malpractice': ['malpractice', 'medical negligence'],
+}
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_title(text):
+    """Lowercase a title and collapse punctuation/whitespace to single spaces."""
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+class RoutingIndex:
+    """Read-only lookup tables derived from a website map.
+
+    Built once per map and never mutated, so request handlers can share it
+    without locking; refreshing the map swaps in a whole new index.
+    """
+
+    def __init__(self, website_map, aliases=SECTION_ALIASES):
+        self.website_map = website_map
+        url_to_page = {}
+        title_to_url = {}
+        for page_title, page_data in website_map.items():
+            url_to_page.setdefault(page_data['url'], (page_title, None))
+            title_to_url[normalize_title(page_title)] = page_data['url']
+            for sub_title, sub_data in page_data.get('subcategories', {}).items():
+                url_to_page.setdefault(sub_data['url'], (sub_title, page_title))
+                title_to_url[normalize_title(sub_title)] = sub_data['url']
+
+        alias_to_url = {}
+        for title, phrases in aliases.items():
+            url = title_to_url.get(normalize_title(title))
+            if not url:
+                continue
+            for phrase in phrases:
+                alias_to_url.setdefault(normalize_title(phrase), url)
+        # Section titles always win over aliases
+        alias_to_url.update(title_to_url)
+
+        self.url_to_page = MappingProxyType(url_to_page)
+        self.urls = tuple(url_to_page)
+        self.title_to_url = MappingProxyType(title_to_url)
+        self.alias_to_url = MappingProxyType(alias_to_url)
+        # Normalized section titles for fuzzy matching (see url_for_choice)
+        self.choices = tuple(title_to_url)
+        self.matcher = SectionMatcher(self.choices)
+        self.nav_items = self._build_nav_items(website_map)
+        self.built_at = time.monotonic()
+
+    @staticmethod
+    def _build_nav_items(website_map):
+        # Plain lists/dicts so jsonify can serialize them as-is; never mutate them.
+        return [
+            {
+                'title': title.capitalize(),
+                'url': data['url'],
+                'subcategories': [
+                    {'title': sub_title.capitalize(), 'url': sub_data['url']}
+                    for sub_title, sub_data in data['subcategories'].items()
+                ] if title.lower() == 'practice areas' else []
+            }
+            for title, data in website_map.items()
+        ]
+
+    def lookup(self, text):
+        """Resolve a section title or alias to its URL, or None."""
+        return self.alias_to_url.get(normalize_title(text))
+
+    def url_for_choice(self, choice):
+        """Return the URL of a normalized title from ``choices``."""
+        return self.title_to_url.get(choice)
+
+    def page_for_url(self, url):
+        """Return (page_title, parent_page) for a URL, or (None, None)."""
+        return self.url_to_page.get(url, (None, None))
+
+    def title_for_url(self, url):
+        return self.page_for_url(url)[0]
+
+
+_index = None
+_index_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def refresh_routing_index(website_map=None):
+    """Build a new index (from a fresh map by default) and swap it in atomically."""
+    global _index
+    website_map = website_map if website_map is not None else load_website_map()
+    index = RoutingIndex(website_map)
+    with _index_lock:
+        _index = index
+    logging.debug("Routing index built with %s pages.", len(index.url_to_page))
+    return index
+
+
+def get_routing_index():
+    """Return the current routing index, building it on first use.
+
+    Once the index is older than ROUTING_REFRESH_SECONDS one caller rebuilds
+    it while the others keep using the current one.
+    """
+    index = _index
+    if index is None:
+        index = refresh_routing_index()
+    elif ROUTING_REFRESH_SECONDS and time.monotonic() - index.built_at > ROUTING_REFRESH_SECONDS:
+        if _refresh_lock.acquire(blocking=False):
+            try:
+                index = refresh_routing_index()
+            finally:
+                _refresh_lock.release()
+    return index
+
+
+def index_for(website_map):
+    """Return the shared index when it was built from ``website_map``, else a one-off index."""
+    index = _index
+    if index is not None and index.website_map is website_map:
+        return index
+    return RoutingIndex(website_map)
@@ -1,60 +1,214 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 import logging
+import os
+import threading
 import time
-try:
-    from selenium import webdriver
-    from selenium.webdriver.chrome.service import Service
-    from selenium.webdriver.chrome.options import Options
-    from webdriver_manager.chrome import ChromeDriverManager
-except ImportError as e:
-    logging.error(f"Selenium import failed: {e}")
-    raise
+from urllib.parse import urlsplit, urlunsplit
+from driver_pool import get_driver_pool, USER_AGENT
+from page_cache import page_cache
+from singleflight import SingleFlight
+from metrics import stage, FETCHES
+from database import get_discovered_pages
 
 logging.basicConfig(level=logging.DEBUG)
 
-def fetch_page(url, use_selenium=True, retries=2, delay=2):
-    """Fetch and parse a webpage, returning a BeautifulSoup object, with retries."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36'
-    }
+# 'browser' renders every page in Chrome, 'requests' never starts a browser and
+# 'auto' downloads with requests first and only renders pages that need JavaScript.
+FETCH_MODE = os.environ.get('SCRAPER_FETCH_MODE', 'auto')
+# Send every fetch to another origin (e.g. the benchmark fixture server) while
+# keeping the site's URLs as cache and routing keys.
+ORIGIN_OVERRIDE = os.environ.get('SCRAPER_ORIGIN_OVERRIDE', '')
+MIN_STATIC_WORDS = int(os.environ.get('SCRAPER_MIN_STATIC_WORDS', '50'))
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+# Only the body is ever searched, so skip building the <head> subtree
+BODY_ONLY = SoupStrainer('body')
+# Keep-alive connection pool shared by every requests-based fetch
+HTTP_POOL_CONNECTIONS = int(os.environ.get('SCRAPER_HTTP_POOL_CONNECTIONS', '4'))
+HTTP_POOL_MAXSIZE = int(os.environ.get('SCRAPER_HTTP_POOL_MAXSIZE', '10'))
 
-    # Try with Selenium first
-    if use_selenium:
-        for attempt in range(retries + 1):
-            try:
-                options = Options()
-                options.add_argument('--headless')
-                options.add_argument('--disable-gpu')
-                options.add_argument(f'user-agent={headers["User-Agent"]}')
-                service = Service(ChromeDriverManager().install())
-                driver = webdriver.Chrome(service=service, options=options)
-                driver.get(url)
-                time.sleep(1)  # Wait for page to load
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
-                driver.quit()
-                return soup
-            except Exception as e:
-                logging.error(f"Attempt {attempt + 1}/{retries + 1} - Error fetching {url} with Selenium: {e}")
-                if attempt == retries:
-                    logging.warning(f"Max retries reached for Selenium. Falling back to requests for {url}.")
-                    break
-                time.sleep(delay)
+_http_session = None
+_fetch_flights = SingleFlight()
+_http_session_lock = threading.Lock()
 
-    # Fallback to requests
+def get_http_session():
+    """Return the shared requests session, creating its connection pool on first use."""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                _http_session = session
+    return _http_session
+
+def origin_url(url):
+    """Return the URL actually requested for ``url``, honouring ORIGIN_OVERRIDE."""
+    if not ORIGIN_OVERRIDE:
+        return url
+    override = urlsplit(ORIGIN_OVERRIDE)
+    parts = urlsplit(url)
+    return urlunsplit((override.scheme, override.netloc, parts.path, parts.query, parts.fragment))
+
+def parse_html(html):
+    """Parse a page's body with the fastest available parser."""
+    with stage('fetch.parse'):
+        return BeautifulSoup(html, HTML_PARSER, parse_only=BODY_ONLY)
+
+def needs_javascript(soup):
+    """Guess whether a statically downloaded page only renders with JavaScript."""
+    body = soup.body or soup
+    if not body.find('p'):
+        return True
+    for noscript in body.find_all('noscript'):
+        if 'enable javascript' in noscript.get_text(' ', strip=True).lower():
+            return True
+    return len(body.get_text(' ', strip=True).split()) < MIN_STATIC_WORDS
+
+def _fetch_with_selenium(url, retries, delay):
+    """Render a page in a pooled browser and return its HTML."""
+    pool = get_driver_pool()
     for attempt in range(retries + 1):
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            with stage('fetch.browser'):
+                html = pool.fetch_html(origin_url(url))
+            FETCHES.inc(source='browser')
+            return html
+        except Exception as e:
+            logging.error("Attempt %s/%s - Error fetching %s with Selenium: %s", attempt + 1, retries + 1, url, e)
+            if attempt == retries:
+                logging.warning("Max retries reached for Selenium for %s.", url)
+                FETCHES.inc(source='failed')
+                return None
+            time.sleep(delay)
+
+def _fetch_with_requests(url, retries, delay):
+    """Download a page and return the response (None after exhausting retries)."""
+    session = get_http_session()
+    for attempt in range(retries + 1):
+        try:
+            with stage('fetch.download'):
+                response = session.get(origin_url(url), timeout=10)
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            return soup
+            FETCHES.inc(source='network')
+            return response
         except requests.RequestException as e:
-            logging.error(f"Attempt {attempt + 1}/{retries + 1} - Error fetching {url}: {e}")
+            logging.error("Attempt %s/%s - Error fetching %s: %s", attempt + 1, retries + 1, url, e)
             if attempt == retries:
-                logging.error(f"Max retries reached for {url}. Failed to fetch content.")
+                logging.error("Max retries reached for %s. Failed to fetch content.", url)
+                FETCHES.inc(source='failed')
                 return None
             time.sleep(delay)
 
+def _fetch_fresh(url, mode, retries, delay):
+    """Fetch a page from the origin, parse it and store it in the page cache."""
+    if mode == 'auto':
+        response = _fetch_with_requests(url, retries, delay)
+        if response is not None:
+            soup = parse_html(response.text)
+            if not needs_javascript(soup):
+                page_cache.put(url, response.text, soup,
+                               response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                return soup
+        logging.debug("%s needs a browser to render; using Selenium.", url)
+        html = _fetch_with_selenium(url, retries, delay)
+        if html is not None:
+            soup = parse_html(html)
+            page_cache.put(url, html, soup)
+            return soup
+        if response is None:
+            return None
+        # Keep the static download rather than failing outright, but don't cache it.
+        return soup
+
+    # Try with Selenium first
+    if mode == 'browser':
+        html = _fetch_with_selenium(url, retries, delay)
+        if html is not None:
+            soup = parse_html(html)
+            page_cache.put(url, html, soup)
+            return soup
+        logging.warning("Falling back to requests for %s.", url)
+
+    # Fallback to requests
+    response = _fetch_with_requests(url, retries, delay)
+    if response is None:
+        return None
+    soup = parse_html(response.text)
+    page_cache.put(url, response.text, soup,
+                   response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return soup
+
+def _revalidate(entry, mode, retries, delay):
+    """Revalidate a stale cache entry; returns its soup if unchanged, else None."""
+    try:
+        with stage('fetch.revalidate'):
+            response = get_http_session().get(origin_url(entry.url), headers=entry.conditional_headers(), timeout=10)
+    except requests.RequestException as e:
+        logging.warning("Revalidation of %s failed, serving stale copy: %s", entry.url, e)
+        return entry.soup
+    if response.status_code == 304:
+        page_cache.mark_revalidated(entry)
+        FETCHES.inc(source='revalidated')
+        logging.debug("%s not modified; cache entry revalidated.", entry.url)
+        return entry.soup
+    if response.ok and mode != 'browser':
+        soup = parse_html(response.text)
+        if not needs_javascript(soup):
+            page_cache.put(entry.url, response.text, soup,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return soup
+    return None
+
+def _fetch_uncached(url, mode, retries, delay, use_cache):
+    """Revalidate or refetch a page that isn't fresh in the cache."""
+    if use_cache:
+        entry = page_cache.peek(url)
+        if entry is not None:
+            # Another flight may have refreshed the entry since the caller checked
+            if entry.is_fresh():
+                return entry.soup
+            if entry.can_revalidate():
+                soup = _revalidate(entry, mode, retries, delay)
+                if soup is not None:
+                    return soup
+
+    return _fetch_fresh(url, mode, retries, delay)
+
+def fetch_page(url, use_selenium=True, retries=2, delay=2, mode=None, use_cache=True):
+    """Fetch and parse a webpage, returning a BeautifulSoup object, with retries.
+
+    Pages are served from the page cache while fresh and revalidated with a
+    conditional request once their TTL expires. Concurrent fetches of the same
+    URL share a single download (or browser session) and its result.
+    """
+    mode = mode or FETCH_MODE
+    if not use_selenium:
+        mode = 'requests'
+
+    if use_cache:
+        with stage('fetch.cache_lookup'):
+            entry = page_cache.get(url)
+        if entry is not None and entry.is_fresh():
+            FETCHES.inc(source='cache')
+            return entry.soup
+
+    # A use_cache=False caller (e.g. the crawler forcing a re-render) must not
+    # join a flight that may answer from a stale or revalidated cache entry
+    return _fetch_flights.do((url, mode, use_cache), lambda: _fetch_uncached(url, mode, retries, delay, use_cache))
+
+def get_fetch_stats():
+    """Return how many fetches ran and how many were deduplicated by coalescing."""
+    return _fetch_flights.stats()
+
 def build_website_map(base_url="https://stolmeierlaw.com/"):
     """Build a knowledge map of the website's structure (titles and URLs only, no content)."""
     website_map = {}
@@ -85,11 +239,51 @@ def build_website_map(base_url="https://stolmeierlaw.com/"):
         sub['title'].lower(): {'url': sub['url'], 'content': []} for sub in practice_area_subcategories
     }
 
-    logging.debug(f"Website map structure: {website_map}")
+    logging.debug("Website map built with %s pages.", len(website_map))
     return website_map
 
+def iter_pages(website_map):
+    """Yield (page_title, url, parent_page) for every page and subcategory in the map."""
+    for page_title, page_data in website_map.items():
+        yield page_title, page_data['url'], None
+        for sub_title, sub_data in page_data.get('subcategories', {}).items():
+            yield sub_title, sub_data['url'], page_title
+
+def merge_discovered_pages(website_map, pages):
+    """Return a copy of ``website_map`` with discovered pages added as subcategories.
+
+    Pages whose URL or title is already in the map are left out, so the
+    built-in sections always keep their URLs.
+    """
+    merged = {title: {**data, 'subcategories': dict(data.get('subcategories', {}))}
+              for title, data in website_map.items()}
+    known_urls = {url for _, url, _ in iter_pages(merged)}
+    known_titles = {title for title, _, _ in iter_pages(merged)}
+    for url, page_title, parent_page in pages:
+        if url in known_urls or page_title in known_titles or parent_page not in merged:
+            continue
+        merged[parent_page]['subcategories'][page_title] = {'url': url, 'content': []}
+        known_urls.add(url)
+        known_titles.add(page_title)
+    return merged
+
+def load_website_map():
+    """The built-in website map plus every page discovered by the last crawl."""
+    return merge_discovered_pages(build_website_map(), get_discovered_pages())
+
+# scrape_contact_info_fallback() replies starting with these report a failure, not contact details
+CONTACT_FALLBACK_FAILURES = ('Sorry', 'No contact')
+
+def is_contact_info(text):
+    """True if a scrape_contact_info_fallback() reply holds contact details worth storing."""
+    return bool(text) and not text.startswith(CONTACT_FALLBACK_FAILURES)
+
 def scrape_contact_info_fallback():
-    """Scrape contact info directly from the website (only when requested)."""
+    """Scrape contact info directly from the website (only when requested).
+
+    Failures come back as a message for the visitor; check is_contact_info()
+    before storing the result.
+    """
     soup = fetch_page("https://stolmeierlaw.com/")
     if not soup:
         return "Sorry, I couldn't fetch contact information."
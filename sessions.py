@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from database import connection, transaction
+
+logging.basicConfig(level=logging.DEBUG)
+
+# 'sqlite' shares sessions between worker processes through website_map.db;
+# 'memory' keeps them in this process only.
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite')
+SESSION_TTL = float(os.environ.get('SESSION_TTL', '1800'))
+SESSION_MAX = int(os.environ.get('SESSION_MAX', '10000'))
+# The SQLite store prunes expired/excess sessions once every this many writes
+SESSION_PRUNE_EVERY = int(os.environ.get('SESSION_PRUNE_EVERY', '100'))
+
+
+class Session:
+    """Conversational context for one visitor: the last page they were shown."""
+
+    __slots__ = ('session_id', 'last_url', 'last_title', 'last_intent', 'last_keywords', 'updated_at')
+
+    def __init__(self, session_id, last_url=None, last_title=None, last_intent=None, last_keywords=(), updated_at=None):
+        self.session_id = session_id
+        self.last_url = last_url
+        self.last_title = last_title
+        self.last_intent = last_intent
+        self.last_keywords = tuple(last_keywords)
+        self.updated_at = updated_at if updated_at is not None else time.time()
+
+
+class MemorySessionStore:
+    """In-process session store with TTL expiry and LRU eviction."""
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.time() - session.updated_at > self.ttl:
+                del self._sessions[session_id]
+                self._evictions += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def get_many(self, session_ids):
+        """Return {session_id: Session} for the ids that have a live session."""
+        found = {}
+        for session_id in set(session_ids):
+            session = self.get(session_id)
+            if session is not None:
+                found[session_id] = session
+        return found
+
+    def save(self, session):
+        self.save_many([session])
+
+    def save_many(self, sessions):
+        now = time.time()
+        with self._lock:
+            for session in sessions:
+                session.updated_at = now
+                self._sessions[session.session_id] = session
+                self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'sessions': len(self._sessions), 'evictions': self._evictions}
+
+
+class SQLiteSessionStore:
+    """Session store shared by every worker process through SQLite.
+
+    Sessions idle longer than ``ttl`` are ignored and periodically deleted,
+    along with the least recently used ones beyond ``max_sessions``.
+    """
+
+    GET_SQL = ("SELECT last_url, last_title, last_intent, last_keywords, updated_at "
+               "FROM sessions WHERE session_id = ? AND updated_at >= ?")
+    SAVE_SQL = ("INSERT OR REPLACE INTO sessions (session_id, last_url, last_title, last_intent, last_keywords, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)")
+    GET_MANY_SQL = ("SELECT session_id, last_url, last_title, last_intent, last_keywords, updated_at "
+                    "FROM sessions WHERE session_id IN ({}) AND updated_at >= ?")
+    # Ids per IN (...) query, within SQLite's default limit on bound parameters
+    GET_MANY_CHUNK = 500
+    EXPIRE_SQL = "DELETE FROM sessions WHERE updated_at < ?"
+    TRIM_SQL = ("DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)")
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=SESSION_MAX, prune_every=SESSION_PRUNE_EVERY):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        try:
+            with connection() as conn:
+                row = conn.execute(self.GET_SQL, (session_id, time.time() - self.ttl)).fetchone()
+        except sqlite3.Error as e:
+            logging.error("Error loading session %s: %s", session_id, e)
+            return None
+        if row is None:
+            return None
+        last_url, last_title, last_intent, last_keywords, updated_at = row
+        return Session(session_id, last_url, last_title, last_intent, json.loads(last_keywords or '[]'), updated_at)
+
+    def get_many(self, session_ids):
+        """Return {session_id: Session} for the ids that have a live session."""
+        session_ids = list(set(session_ids))
+        found = {}
+        try:
+            with connection() as conn:
+                for start in range(0, len(session_ids), self.GET_MANY_CHUNK):
+                    chunk = session_ids[start:start + self.GET_MANY_CHUNK]
+                    sql = self.GET_MANY_SQL.format(', '.join('?' * len(chunk)))
+                    for row in conn.execute(sql, (*chunk, time.time() - self.ttl)):
+                        session_id, last_url, last_title, last_intent, last_keywords, updated_at = row
+                        found[session_id] = Session(session_id, last_url, last_title, last_intent,
+                                                    json.loads(last_keywords or '[]'), updated_at)
+        except sqlite3.Error as e:
+            logging.error("Error loading %s session(s): %s", len(session_ids), e)
+        return found
+
+    def save(self, session):
+        self.save_many([session])
+
+    def save_many(self, sessions):
+        """Save several sessions in one transaction."""
+        sessions = list(sessions)
+        if not sessions:
+            return
+        now = time.time()
+        rows = []
+        for session in sessions:
+            session.updated_at = now
+            rows.append((session.session_id, session.last_url, session.last_title, session.last_intent,
+                         json.dumps(list(session.last_keywords)), session.updated_at))
+        try:
+            with transaction() as conn:
+                conn.executemany(self.SAVE_SQL, rows)
+        except sqlite3.Error as e:
+            logging.error("Error saving %s session(s) (first %s): %s", len(rows), rows[0][0], e)
+            return
+        with self._lock:
+            before = self._writes
+            self._writes += len(rows)
+            prune = self._writes // self.prune_every > before // self.prune_every
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Delete expired sessions and the least recently used ones over the cap."""
+        try:
+            with transaction() as conn:
+                conn.execute(self.EXPIRE_SQL, (time.time() - self.ttl,))
+                conn.execute(self.TRIM_SQL, (self.max_sessions,))
+        except sqlite3.Error as e:
+            logging.error("Error pruning sessions: %s", e)
+
+    def stats(self):
+        try:
+            with connection() as conn:
+                count = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        except sqlite3.Error:
+            count = None
+        return {'backend': 'sqlite', 'sessions': count}
+
+
+class PendingSessions:
+    """Collects session writes over a batch of messages and saves them together.
+
+    Reads see the pending writes first, so a later message in the batch still
+    follows up on an earlier one from the same visitor.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._pending = {}
+        self._loaded = {}
+
+    def load(self, session_ids):
+        """Read the stored sessions for ``session_ids`` up front, in one query."""
+        session_ids = set(session_ids)
+        found = self.store.get_many(session_ids)
+        self._loaded.update({session_id: found.get(session_id) for session_id in session_ids})
+
+    def get(self, session_id):
+        session = self._pending.get(session_id)
+        if session is not None:
+            return session
+        if session_id in self._loaded:
+            return self._loaded[session_id]
+        return self.store.get(session_id)
+
+    def save(self, session):
+        self._pending[session.session_id] = session
+
+    def flush(self):
+        """Save every pending session in one write to the underlying store."""
+        self.store.save_many(self._pending.values())
+        self._pending.clear()
+
+
+def create_session_store(backend=SESSION_BACKEND):
+    if backend == 'memory':
+        return MemorySessionStore()
+    return SQLiteSessionStore()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+from collections import Counter
+from unittest import mock
+
+import database
+import scraper
+from benchmarks.fixture_server import start_fixture_server
+from page_cache import page_cache
+
+CAR_ACCIDENTS = 'https://stolmeierlaw.com/car-accidents/'
+FAMILY_LAW = 'https://stolmeierlaw.com/family-law/'
+
+
+class ChatBatchTest(unittest.TestCase):
+    """/chat/batch against a throwaway database, fetching pages from the fixture server."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.server, origin = start_fixture_server()
+        cls.patches = [
+            mock.patch.object(database, 'DB_PATH', os.path.join(cls.directory.name, 'test.db')),
+            mock.patch.object(scraper, 'ORIGIN_OVERRIDE', origin),
+            mock.patch.object(scraper, 'FETCH_MODE', 'requests'),
+        ]
+        for patch in cls.patches:
+            patch.start()
+        import app
+        from routing import refresh_routing_index
+        database.init_db()
+        refresh_routing_index()
+        cls.app = app
+        cls.client = app.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in reversed(cls.patches):
+            patch.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        # Nothing is ingested, so every section is fetched and parsed live
+        page_cache.clear()
+        self.fetched = Counter()
+        fetch = scraper._fetch_with_requests
+
+        def counting_fetch(url, retries, delay):
+            self.fetched[url] += 1
+            return fetch(url, retries, delay)
+
+        patch = mock.patch.object(scraper, '_fetch_with_requests', side_effect=counting_fetch)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def batch(self, items):
+        response = self.client.post('/chat/batch', json=items)
+        self.assertEqual(response.status_code, 200)
+        return [item['response'] for item in response.json['responses']]
+
+    def test_replies_in_input_order_with_the_chat_text(self):
+        messages = ['what are the causes of car accidents?', 'yes', 'tell me about family law',
+                    'car accidents', '']
+        replies = self.batch([{'message': message, 'session_id': f'order-{i}'}
+                              for i, message in enumerate(messages)])
+        expected = [self.client.post('/chat', json={'message': message, 'session_id': f'order-chat-{i}'}).json['response']
+                    for i, message in enumerate(messages)]
+        self.assertEqual(replies, expected)
+        self.assertTrue(replies[0].startswith('Common Causes of Car accidents'))
+        self.assertEqual(replies[1], 'Thank you for your feedback! How can I assist you further?')
+        self.assertTrue(replies[2].startswith('About Family law'))
+        self.assertEqual(replies[4], 'Please provide a message.')
+
+    def test_each_page_is_fetched_once(self):
+        messages = ['car accidents', 'what are the causes of car accidents?', 'tell me about car accidents',
+                    'family law', 'who handles family law?', 'car accidents']
+        self.batch([{'message': message, 'session_id': f'fetch-{i}'} for i, message in enumerate(messages)])
+        self.assertEqual(self.fetched, Counter({CAR_ACCIDENTS: 1, FAMILY_LAW: 1}))
+
+    def test_follow_up_sees_an_earlier_item_of_the_same_session(self):
+        replies = self.batch([
+            {'message': 'family law', 'session_id': 'follow-a'},
+            {'message': 'what are the causes?', 'session_id': 'follow-b'},
+            {'message': 'what are the causes?', 'session_id': 'follow-a'},
+        ])
+        self.assertTrue(replies[2].startswith('Common Causes of Family law'))
+        self.assertFalse(replies[1].startswith('Common Causes of'))
+        # The context is saved for later requests too
+        reply = self.client.post('/chat', json={'message': 'who are they?', 'session_id': 'follow-a'}).json
+        self.assertTrue(reply['response'].startswith('About Family law'))
+
+    def test_invalid_items_get_a_reply_of_their_own(self):
+        response = self.client.post('/chat/batch', json={'items': [
+            None, 5, {'message': 3}, {'message': 'car accidents', 'session_id': 7}, {'session_id': 'x'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        responses = response.json['responses']
+        self.assertEqual([item['response'] for item in responses[:3]], ['Please provide a message.'] * 3)
+        self.assertEqual(responses[3]['session_id'], 'default')
+        self.assertTrue(responses[3]['response'].startswith('Here’s what I found about Car accidents'))
+        self.assertEqual(responses[4], {'session_id': 'x', 'response': 'Please provide a message.'})
+
+    def test_rejects_a_body_that_is_not_a_list(self):
+        for body in [{'message': 'car accidents'}, {'items': 'car accidents'}, 'car accidents']:
+            with self.subTest(body=body):
+                self.assertEqual(self.client.post('/chat/batch', json=body).status_code, 400)
+
+    def test_rejects_more_than_the_maximum_items(self):
+        with mock.patch.object(self.app, 'CHAT_BATCH_MAX_ITEMS', 2):
+            response = self.client.post('/chat/batch', json=[{'message': 'car accidents'}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('At most 2 items', response.json['error'])
+        self.assertEqual(self.fetched, Counter())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from database import ConnectionPool
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.pool = ConnectionPool(os.path.join(directory.name, 'test.db'), max_size=2, timeout=0.1)
+        self.addCleanup(self.pool.close)
+
+    def test_threads_reuse_returned_connections(self):
+        seen = []
+
+        def borrow():
+            with self.pool.connection() as conn:
+                seen.append(conn)
+
+        for _ in range(5):
+            thread = threading.Thread(target=borrow)
+            thread.start()
+            thread.join()
+        self.assertEqual(len(set(map(id, seen))), 1)
+
+    def test_waits_then_fails_when_every_connection_is_borrowed(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.assertIsNot(first, second)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.pool.acquire()
+        self.pool.release(first)
+        self.assertIs(self.pool.acquire(), first)
+        self.pool.release(first)
+        self.pool.release(second)
+
+    def test_release_rolls_back_an_open_transaction(self):
+        with self.pool.connection() as conn:
+            conn.execute("CREATE TABLE t (x)")
+            conn.execute("INSERT INTO t VALUES (1)")
+            self.assertTrue(conn.in_transaction)
+        with self.pool.connection() as conn:
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone()[0], 0)
+
+    def test_connections_are_configured(self):
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import http.server
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from urllib.parse import urlsplit
+
+import crawler
+import database
+import scraper
+from benchmarks import fixture_server
+from crawler import Crawler, parent_for
+from database import connection, get_page_content, init_db
+from page_cache import page_cache
+
+BASE_URL = 'https://stolmeierlaw.com/'
+CAR_ACCIDENTS = BASE_URL + 'car-accidents/'
+TRUCK_ACCIDENTS = BASE_URL + 'truck-accidents/'
+SLIP_AND_FALL = BASE_URL + 'slip-and-fall/'
+BUILT_IN_PAGES = 12
+
+
+class SiteHandler(fixture_server.FixtureHandler):
+    """The fixture server, answering 404 for the paths in ``server.missing``."""
+
+    def do_GET(self):
+        if urlsplit(self.path).path in self.server.missing:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+class CrawlerTest(unittest.TestCase):
+    """Crawls of the built-in map plus two sitemap pages, served by the fixture server."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+        self.server.daemon_threads = True
+        self.server.missing = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        # Pages a test rewrites; everything else is the generated stand-in
+        self.pages = {}
+        stand_in_page = fixture_server.stand_in_page
+        self.sitemap = {TRUCK_ACCIDENTS: '2026-01-01', SLIP_AND_FALL: '2026-01-01'}
+        for patch in [
+            mock.patch.object(database, 'DB_PATH', os.path.join(directory.name, 'test.db')),
+            mock.patch.object(fixture_server, 'FIXTURES_DIR', directory.name),
+            mock.patch.object(fixture_server, 'stand_in_page', lambda path: self.pages.get(path) or stand_in_page(path)),
+            mock.patch.object(scraper, 'ORIGIN_OVERRIDE', f'http://127.0.0.1:{self.server.server_port}'),
+            mock.patch.object(scraper, 'FETCH_MODE', 'requests'),
+            mock.patch.object(crawler, 'read_sitemaps', lambda base_url: dict(self.sitemap)),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+        init_db()
+        self.addCleanup(database.get_pool().close)
+        page_cache.clear()
+
+    def crawl(self):
+        return Crawler(BASE_URL, max_depth=0).run()
+
+    def pages_table(self):
+        with connection() as conn:
+            return {url: (title, parent) for url, title, parent in conn.execute(
+                "SELECT url, page_title, parent_page FROM pages WHERE discovered = 1")}
+
+    def test_first_crawl_extracts_every_page(self):
+        counts = self.crawl()
+        self.assertEqual(counts['changed'], BUILT_IN_PAGES + 2)
+        self.assertEqual(counts['crawled'], BUILT_IN_PAGES + 2)
+        self.assertEqual(self.pages_table(), {TRUCK_ACCIDENTS: ('truck accidents', 'practice areas'),
+                                              SLIP_AND_FALL: ('slip and fall', 'practice areas')})
+        self.assertTrue(get_page_content('truck accidents', 'description', 'practice areas'))
+
+    def test_recrawl_skips_unchanged_lastmod_and_revalidates_the_rest(self):
+        self.crawl()
+        counts = self.crawl()
+        # Sitemap pages keep their lastmod; the built-in ones answer 304 to their ETag
+        self.assertEqual(counts['lastmod_unchanged'], 2)
+        self.assertEqual(counts['not_modified'], BUILT_IN_PAGES)
+        self.assertEqual(counts['changed'], 0)
+
+    def test_same_content_without_validators_is_unchanged(self):
+        self.crawl()
+        with connection() as conn, conn:
+            conn.execute("UPDATE pages SET etag = NULL")
+        counts = self.crawl()
+        self.assertEqual(counts['unchanged'], BUILT_IN_PAGES)
+        self.assertEqual(counts['changed'], 0)
+
+    def test_changed_page_is_re_extracted(self):
+        self.crawl()
+        self.pages['/truck-accidents/'] = fixture_server.stand_in_page('/truck-accidents/').replace(
+            'Every case begins', 'Every trucking case begins')
+        self.sitemap[TRUCK_ACCIDENTS] = '2026-02-01'
+        counts = self.crawl()
+        self.assertEqual(counts['changed'], 1)
+        description = get_page_content('truck accidents', 'description', 'practice areas')
+        self.assertTrue(any('Every trucking case begins' in text for text in description))
+
+    def test_gone_discovered_page_is_deleted(self):
+        self.crawl()
+        self.server.missing.add('/slip-and-fall/')
+        self.sitemap[SLIP_AND_FALL] = '2026-02-01'
+        counts = self.crawl()
+        self.assertEqual(counts['gone'], 1)
+        self.assertEqual(set(self.pages_table()), {TRUCK_ACCIDENTS})
+        self.assertIsNone(get_page_content('slip and fall', 'description', 'practice areas'))
+        with connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM subcategories WHERE url = ?",
+                                          (SLIP_AND_FALL,)).fetchone()[0], 0)
+
+    def test_discovered_page_cannot_take_a_built_in_title(self):
+        impostor = BASE_URL + 'car-accident-lawyer/'
+        self.sitemap[impostor] = '2026-01-01'
+        self.pages['/car-accident-lawyer/'] = fixture_server.stand_in_page('/car-accidents/').replace(
+            'Every case begins', 'Impostor text begins')
+        self.crawl()
+        description = get_page_content('car accidents', 'description', 'practice areas')
+        self.assertTrue(description)
+        self.assertFalse(any('Impostor' in text for text in description))
+        with connection() as conn:
+            self.assertEqual(conn.execute("SELECT url FROM subcategories WHERE sub_title = 'car accidents' "
+                                          "GROUP BY url").fetchall(), [(CAR_ACCIDENTS,)])
+
+
+class ParentForTest(unittest.TestCase):
+    def test_sections_by_url_prefix_and_root_pages_under_practice_areas(self):
+        website_map = scraper.build_website_map()
+        self.assertEqual(parent_for(BASE_URL + 'blogs/x/', website_map), 'blogs')
+        self.assertEqual(parent_for(TRUCK_ACCIDENTS, website_map), 'practice areas')
+        self.assertEqual(parent_for(BASE_URL + 'practice-areas/boating/', website_map), 'practice areas')
+        self.assertEqual(parent_for(BASE_URL + 'a/b/', website_map), 'home')
+
+
+if __name__ == '__main__':
+    unittest.main()
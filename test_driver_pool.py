@@ -0,0 +1,120 @@
+import threading
+import time
+import unittest
+
+from driver_pool import DriverPool, PoolTimeout, _PooledDriver
+
+
+class FakeDriver:
+    """Stands in for a WebDriver: healthy until quit."""
+
+    def __init__(self):
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if self.quit_called:
+            raise RuntimeError('driver quit')
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class FakeDriverPool(DriverPool):
+    def _create_driver(self):
+        with self._lock:
+            self._created += 1
+        return _PooledDriver(FakeDriver())
+
+
+class DriverPoolTest(unittest.TestCase):
+    def borrow_in_thread(self, pool):
+        """Start a thread that borrows a driver; returns (thread, result dict)."""
+        result = {}
+
+        def borrow():
+            started = time.monotonic()
+            try:
+                result['driver'] = pool.acquire()
+            except PoolTimeout as e:
+                result['error'] = e
+            result['waited'] = time.monotonic() - started
+
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        return thread, result
+
+    def test_waiter_wakes_when_recycled_driver_frees_a_slot(self):
+        pool = FakeDriverPool(size=1, wait_timeout=5, max_uses=1)
+        pooled = pool.acquire()
+        thread, result = self.borrow_in_thread(pool)
+        time.sleep(0.2)
+        pool.release(pooled)  # max_uses reached: the driver is quit, freeing its slot
+        thread.join(timeout=5)
+        self.assertIn('driver', result)
+        self.assertLess(result['waited'], 1)
+        self.assertEqual(pool.stats()['recycled'], 1)
+        self.assertEqual(pool.stats()['created'], 2)
+
+    def test_waiter_wakes_when_broken_driver_is_discarded(self):
+        pool = FakeDriverPool(size=1, wait_timeout=5)
+        pooled = pool.acquire()
+        thread, result = self.borrow_in_thread(pool)
+        time.sleep(0.2)
+        pool.release(pooled, broken=True)
+        thread.join(timeout=5)
+        self.assertIn('driver', result)
+        self.assertLess(result['waited'], 1)
+
+    def test_waiter_reuses_returned_driver(self):
+        pool = FakeDriverPool(size=1, wait_timeout=5)
+        pooled = pool.acquire()
+        thread, result = self.borrow_in_thread(pool)
+        time.sleep(0.2)
+        pool.release(pooled)
+        thread.join(timeout=5)
+        self.assertIs(result['driver'], pooled)
+        self.assertLess(result['waited'], 1)
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_times_out_when_no_driver_is_returned(self):
+        pool = FakeDriverPool(size=1, wait_timeout=0.2)
+        pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_unhealthy_idle_driver_is_replaced(self):
+        pool = FakeDriverPool(size=1, wait_timeout=1)
+        pooled = pool.acquire()
+        pool.release(pooled)
+        pooled.driver.quit()
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, pooled)
+        self.assertEqual(pool.stats()['live'], 1)
+
+    def test_concurrent_borrowers_never_exceed_size(self):
+        pool = FakeDriverPool(size=2, wait_timeout=5, max_uses=3)
+        peak = []
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(10):
+                pooled = pool.acquire()
+                with lock:
+                    peak.append(pool.stats()['live'])
+                time.sleep(0.001)
+                pool.release(pooled)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(pool.stats()['borrows'], 60)
+        self.assertEqual(pool.stats()['in_use'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import random
+import unittest
+
+from extractor import extract_sections
+from nlp import INTENTS, format_snippets
+from scraper import parse_html
+
+WORDS = ('causes', 'reasons', 'factors', 'about', 'phone', 'email', 'address', 'contact', 'injury', 'car',
+         'accident', 'law', 'firm', 'client', 'Texas', 'case', 'the', 'our', 'we', 'help')
+
+
+def baseline_reply(soup, intent):
+    """The per-intent extraction /chat used before extract_sections(), one find_all per intent."""
+    if intent == 'causes':
+        content = []
+        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4'], string=lambda text: text and any(kw in text.lower() for kw in ['causes', 'reasons', 'factors'])):
+            for elem in heading.find_all_next(['p', 'ul', 'ol'], limit=5):
+                if elem.name == 'p':
+                    text = elem.get_text(strip=True)
+                    if text and len(text.split()) > 5:
+                        content.append(f"- {text}")
+                elif elem.name in ['ul', 'ol']:
+                    for li in elem.find_all('li'):
+                        text = li.get_text(strip=True)
+                        if text:
+                            content.append(f"- {text}")
+        if content:
+            return "\n".join(content)
+        return "Sorry, I couldn’t find specific information about causes for this section."
+
+    if intent == 'about':
+        content = []
+        for heading in soup.find_all(['h1', 'h2', 'h3', 'h4'], string=lambda text: text and 'about' in text.lower()):
+            for elem in heading.find_all_next(['p'], limit=3):
+                text = elem.get_text(strip=True)
+                if text and len(text.split()) > 5:
+                    content.append(text)
+        if content:
+            return "\n\n".join(content)
+        for p in soup.find_all('p', limit=3):
+            text = p.get_text(strip=True)
+            if text and len(text.split()) > 5:
+                content.append(text)
+        if content:
+            return "\n\n".join(content)
+        return "Sorry, I couldn’t find specific information about this section."
+
+    if intent == 'contact':
+        contact_info = []
+        footer = soup.find('footer') or soup.find('div', class_=lambda x: x and 'contact' in x.lower())
+        if footer:
+            for elem in footer.find_all(['p', 'div'], string=lambda text: text and any(keyword in text.lower() for keyword in ['phone', 'email', 'address'])):
+                text = elem.get_text(strip=True)
+                if text:
+                    contact_info.append(text)
+        if contact_info:
+            return "\n".join(contact_info)
+        return "Sorry, I couldn’t find contact information on the website."
+
+    content = []
+    for p in soup.find_all('p', limit=3):
+        text = p.get_text(strip=True)
+        if text and len(text.split()) > 5:
+            content.append(text)
+    if content:
+        return "\n\n".join(content)
+    return "Sorry, I couldn’t find specific information about this section."
+
+
+def random_text(rng, low=0, high=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def random_block(rng, depth=0):
+    """Return random HTML shaped like the site's pages: headings, paragraphs, lists and nested divs."""
+    kind = rng.choice(('heading', 'heading', 'p', 'p', 'p', 'list', 'div', 'footer'))
+    if kind == 'heading':
+        level = rng.randint(1, 5)
+        if rng.random() < 0.3:
+            # Mixed content: heading.string is None, so it never counts as a match
+            return f"<h{level}>{random_text(rng, 1, 3)} <em>{random_text(rng, 1, 2)}</em></h{level}>"
+        return f"<h{level}>{random_text(rng, 0, 4)}</h{level}>"
+    if kind == 'p':
+        if rng.random() < 0.2:
+            return f"<p>{random_text(rng)} <a href='#'>{random_text(rng, 0, 3)}</a></p>"
+        return f"<p>{random_text(rng)}</p>"
+    if kind == 'list':
+        tag = rng.choice(('ul', 'ol'))
+        items = ''.join(f"<li>{random_text(rng, 0, 6)}</li>" for _ in range(rng.randint(0, 4)))
+        return f"<{tag}>{items}</{tag}>"
+    if depth >= 2:
+        return f"<p>{random_text(rng)}</p>"
+    children = ''.join(random_block(rng, depth + 1) for _ in range(rng.randint(0, 4)))
+    if kind == 'footer':
+        return f"<footer>{children}<p>{random_text(rng, 1, 4)}</p></footer>"
+    css_class = rng.choice(('', 'contact-info', 'Contact', 'entry', 'site-contact widget'))
+    return f"<div class='{css_class}'>{children}<div>{random_text(rng, 1, 4)}</div></div>"
+
+
+def random_page(rng):
+    return f"<html><head><title>t</title></head><body>{''.join(random_block(rng) for _ in range(rng.randint(0, 14)))}</body></html>"
+
+
+class ExtractSectionsTest(unittest.TestCase):
+    def test_matches_per_intent_extraction_on_random_pages(self):
+        rng = random.Random(20261018)
+        for page in range(500):
+            html = random_page(rng)
+            soup = parse_html(html)
+            sections = extract_sections(soup)
+            for intent in INTENTS:
+                with self.subTest(page=page, intent=intent):
+                    self.assertEqual(format_snippets(sections.get(intent), intent), baseline_reply(soup, intent), html)
+
+
+if __name__ == '__main__':
+    unittest.main()
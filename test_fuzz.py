@@ -2,4 +2,45 @@ from thefuzz import fuzz, process
 
 # Test fuzzy matching
 print(fuzz.ratio("car accident", "car accidents"))
-print(process.extractOne("car accident", ["car accidents", "personal injury", "family law"], scorer=fuzz.token_sort_ratio))
\ No newline at end of file
+print(process.extractOne("car accident", ["car accidents", "personal injury", "family law"], scorer=fuzz.token_sort_ratio))
+
+def benchmark(repeat=2000):
+    """Compare the per-keyword extractOne loop with the precomputed SectionMatcher."""
+    import timeit
+    from scraper import build_website_map
+    from routing import RoutingIndex
+    from matcher import candidate_phrases
+
+    index = RoutingIndex(build_website_map())
+    sections = list(index.choices)
+    keywords = "my wife was hurt in a bad car accident on the highway last week who should we call".split()
+
+    def extract_one_loop():
+        for keyword in keywords:
+            best_match = process.extractOne(keyword, sections, scorer=fuzz.token_sort_ratio)
+            if best_match and best_match[1] > 80:
+                return best_match[0]
+        return None
+
+    def matcher_batch():
+        best_match = index.matcher.best_match(keywords)
+        return best_match[0] if best_match else None
+
+    def extract_one_phrases():
+        # The old loop given the same multi-word phrases the matcher tries
+        for phrase in candidate_phrases(keywords):
+            best_match = process.extractOne(phrase, sections, scorer=fuzz.token_sort_ratio)
+            if best_match and best_match[1] > 80:
+                return best_match[0]
+        return None
+
+    print(f"{len(keywords)} keywords x {len(sections)} sections, {repeat} runs each")
+    for name, func in [('extractOne loop (tokens)', extract_one_loop),
+                       ('extractOne loop (phrases)', extract_one_phrases),
+                       ('SectionMatcher (phrases)', matcher_batch)]:
+        seconds = min(timeit.repeat(func, number=repeat, repeat=3))
+        print(f"{name:28} {seconds / repeat * 1e6:8.1f} us/message -> {func()!r}")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,58 @@
+import unittest
+from unittest import mock
+
+from nlp import extract_keywords_and_intent, follow_up_url, is_follow_up, scrape_targeted_content
+from scraper import build_website_map
+from sessions import MemorySessionStore, Session
+
+LAST_URL = 'https://stolmeierlaw.com/car-accidents/'
+
+
+class FakeRouting:
+    def title_for_url(self, url):
+        return 'car accidents' if url == LAST_URL else None
+
+
+def follow_up_for(message, session=Session('s1', LAST_URL, 'car accidents')):
+    keywords, _ = extract_keywords_and_intent(message, 's1')
+    return follow_up_url(keywords, session, FakeRouting())
+
+
+class FollowUpTest(unittest.TestCase):
+    def test_intent_questions_follow_up_on_last_page(self):
+        for message in ['what are the causes?', 'What are the common reasons', 'tell me more about it, who?']:
+            with self.subTest(message=message):
+                self.assertEqual(follow_up_for(message), LAST_URL)
+
+    def test_greetings_and_thanks_are_not_follow_ups(self):
+        for message in ['thanks', 'thank you!', 'hello', 'hi there', 'can you help me', 'no thanks']:
+            with self.subTest(message=message):
+                self.assertIsNone(follow_up_for(message))
+
+    def test_question_naming_its_own_subject_is_not_a_follow_up(self):
+        for message in ['who are you?', 'what about insurance?', 'causes of truck crashes']:
+            with self.subTest(message=message):
+                self.assertIsNone(follow_up_for(message))
+
+    def test_empty_keywords_are_not_a_follow_up(self):
+        self.assertFalse(is_follow_up([]))
+        self.assertFalse(is_follow_up(['?']))
+
+    def test_needs_a_session_with_a_known_page(self):
+        self.assertIsNone(follow_up_for('what are the causes?', session=None))
+        self.assertIsNone(follow_up_for('what are the causes?', session=Session('s1', 'https://gone/', 'gone')))
+
+
+class ScrapeTargetedContentTest(unittest.TestCase):
+    def test_records_the_page_in_the_session_store(self):
+        sessions = MemorySessionStore()
+        with mock.patch('nlp.scrape_targeted_snippets', return_value=['Speeding', 'Fatigue']) as scrape:
+            reply = scrape_targeted_content(['car', 'accidents'], 'causes', 's1', LAST_URL, build_website_map(), sessions)
+        scrape.assert_called_once_with(LAST_URL, 'causes')
+        self.assertEqual(reply, '- Speeding\n- Fatigue')
+        session = sessions.get('s1')
+        self.assertEqual((session.last_url, session.last_title, session.last_intent), (LAST_URL, 'car accidents', 'causes'))
+
+
+if __name__ == '__main__':
+    unittest.main()
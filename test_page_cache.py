@@ -0,0 +1,120 @@
+import unittest
+from unittest import mock
+
+import requests
+
+import scraper
+from benchmarks.fixture_server import start_fixture_server
+from page_cache import PageCache
+
+CAR_ACCIDENTS = 'https://stolmeierlaw.com/car-accidents/'
+
+
+def page(size):
+    """HTML of exactly ``size`` bytes; stored without a soup, an entry's size is its HTML's."""
+    return 'x' * size
+
+
+class PageCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used_under_the_byte_cap(self):
+        cache = PageCache(max_bytes=300)
+        for url in ('a', 'b', 'c'):
+            cache.put(url, page(100), None)
+        cache.put('d', page(150), None)
+        self.assertIsNone(cache.peek('a'))
+        self.assertIsNone(cache.peek('b'))
+        self.assertEqual([url for url in ('c', 'd') if cache.peek(url)], ['c', 'd'])
+        self.assertEqual(cache.stats()['bytes'], 250)
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def test_replacing_an_entry_counts_its_new_size_only(self):
+        cache = PageCache(max_bytes=300)
+        cache.put('a', page(200), None)
+        cache.put('a', page(250), None)
+        self.assertEqual(cache.stats()['bytes'], 250)
+        self.assertEqual(cache.stats()['evictions'], 0)
+
+    def test_get_refreshes_recency_and_peek_does_not(self):
+        cache = PageCache(max_bytes=300)
+        for url in ('a', 'b', 'c'):
+            cache.put(url, page(100), None)
+        cache.get('a')
+        cache.peek('b')
+        cache.put('d', page(100), None)
+        self.assertIsNone(cache.peek('b'))
+        self.assertIsNotNone(cache.peek('a'))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 0))
+
+    def test_an_entry_larger_than_the_cache_is_not_stored(self):
+        cache = PageCache(max_bytes=300)
+        cache.put('a', page(100), None)
+        entry = cache.put('big', page(301), None)
+        self.assertEqual(entry.html, page(301))
+        self.assertIsNone(cache.peek('big'))
+        self.assertIsNotNone(cache.peek('a'))
+        self.assertEqual(cache.stats()['bytes'], 100)
+
+    def test_expired_entries_are_kept_and_counted_stale(self):
+        cache = PageCache(ttl=0)
+        cache.put('a', page(100), None, etag='"v1"')
+        entry = cache.get('a')
+        self.assertFalse(entry.is_fresh())
+        self.assertEqual(entry.conditional_headers(), {'If-None-Match': '"v1"'})
+        self.assertEqual(cache.stats()['stale'], 1)
+
+
+class RevalidateTest(unittest.TestCase):
+    """fetch_page against the fixture server with a cache whose entries expire at once."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server, origin = start_fixture_server()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+        patch = mock.patch.object(scraper, 'ORIGIN_OVERRIDE', origin)
+        patch.start()
+        cls.addClassCleanup(patch.stop)
+
+    def setUp(self):
+        self.cache = PageCache(ttl=0)
+        patch = mock.patch.object(scraper, 'page_cache', self.cache)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.get = mock.Mock(wraps=scraper.get_http_session().get)
+        patch = mock.patch.object(scraper, 'get_http_session', return_value=mock.Mock(get=self.get))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def fetch(self):
+        return scraper.fetch_page(CAR_ACCIDENTS, mode='requests', retries=0, delay=0)
+
+    def test_expired_entry_is_revalidated_with_a_conditional_get(self):
+        soup = self.fetch()
+        etag = self.cache.peek(CAR_ACCIDENTS).etag
+        self.assertTrue(etag)
+        with mock.patch.object(self.cache, 'mark_revalidated', wraps=self.cache.mark_revalidated) as revalidated:
+            self.assertIs(self.fetch(), soup)
+        revalidated.assert_called_once_with(self.cache.peek(CAR_ACCIDENTS))
+        self.assertEqual(self.get.call_args.kwargs['headers'], {'If-None-Match': etag})
+        self.assertEqual(self.cache.stats()['revalidated'], 1)
+
+    def test_a_changed_page_replaces_the_entry(self):
+        self.cache.put(CAR_ACCIDENTS, '<html><body><p>old</p></body></html>', scraper.parse_html('<p>old</p>'),
+                       etag='"old"')
+        soup = self.fetch()
+        self.assertEqual(self.get.call_args.kwargs['headers'], {'If-None-Match': '"old"'})
+        self.assertIn('Car Accidents', soup.get_text())
+        self.assertIs(self.cache.peek(CAR_ACCIDENTS).soup, soup)
+        self.assertEqual(self.cache.stats()['revalidated'], 0)
+
+    def test_stale_copy_is_served_when_the_origin_is_unreachable(self):
+        soup = self.fetch()
+        self.get.side_effect = requests.ConnectionError('origin down')
+        self.assertIs(self.fetch(), soup)
+        self.assertEqual(self.get.call_count, 2)
+        self.assertEqual(self.cache.stats()['revalidated'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import database
+from database import (build_match_query, connection, init_db, search_content, store_contact_info, store_crawl,
+                      store_pages, transaction, SEARCH_TRIGGERS_SQL)
+
+CAR_ACCIDENTS = 'https://stolmeierlaw.com/car-accidents/'
+FAMILY_LAW = 'https://stolmeierlaw.com/family-law/'
+SPEEDING = 'Speeding drivers cause most crashes on Texas highways every single year.'
+CALL_US = 'Call our San Antonio office today for a free consultation with a lawyer.'
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patch = mock.patch.object(database, 'DB_PATH', os.path.join(directory.name, 'test.db'))
+        patch.start()
+        self.addCleanup(patch.stop)
+        init_db()
+        self.addCleanup(database.get_pool().close)
+        if not database.SEARCH_AVAILABLE:
+            self.skipTest('this SQLite build lacks FTS5')
+
+    def indexed(self):
+        """Return the sorted (page_title, tag, content) rows in the full-text index."""
+        with connection() as conn:
+            return sorted(conn.execute("SELECT page_title, tag, content FROM search_index").fetchall())
+
+    def test_stored_snippets_are_indexed_and_replaced(self):
+        store_pages([('car accidents', CAR_ACCIDENTS, 'practice areas', {'causes': [SPEEDING]}),
+                     ('home', 'https://stolmeierlaw.com/', None, {'description': [CALL_US]})])
+        self.assertEqual(self.indexed(), [('car accidents', 'causes', SPEEDING), ('home', 'description', CALL_US)])
+
+        store_pages([('car accidents', CAR_ACCIDENTS, 'practice areas', {'causes': ['Drunk drivers cause crashes too.']})])
+        self.assertEqual(self.indexed(), [('car accidents', 'causes', 'Drunk drivers cause crashes too.'),
+                                          ('home', 'description', CALL_US)])
+
+        with transaction() as conn:
+            conn.execute("DELETE FROM website_content")
+        self.assertEqual(self.indexed(), [('car accidents', 'causes', 'Drunk drivers cause crashes too.')])
+
+    def test_crawl_indexes_changed_pages_and_drops_gone_ones(self):
+        state = (FAMILY_LAW, 'family law', 'practice areas', 1, None, None, None, 'hash', '[]', 0.0)
+        store_crawl([('family law', FAMILY_LAW, 'practice areas', {'about': [CALL_US]})], [state])
+        self.assertEqual(self.indexed(), [('family law', 'about', CALL_US)])
+        store_crawl([], [], gone=[FAMILY_LAW])
+        self.assertEqual(self.indexed(), [])
+
+    def test_raw_html_tags_are_not_indexed(self):
+        store_pages([('home', 'https://stolmeierlaw.com/', None, {'p': [SPEEDING], 'h2': ['Speeding']})])
+        store_contact_info('Phone: (210) 555-0100')
+        self.assertEqual(self.indexed(), [])
+        self.assertEqual(search_content(['speeding']), [])
+
+    def test_a_query_of_stopwords_matches_nothing(self):
+        store_pages([('home', 'https://stolmeierlaw.com/', None, {'description': [CALL_US]})])
+        self.assertEqual(build_match_query(['can', 'you', 'tell', 'me', 'what', 'the']), '')
+        self.assertEqual(search_content(['can', 'you', 'tell', 'me', 'what', 'the']), [])
+
+    def test_one_result_per_page_and_repeated_paragraphs_quoted_once(self):
+        store_pages([
+            ('car accidents', CAR_ACCIDENTS, 'practice areas',
+             {'causes': [SPEEDING, 'Speeding through school zones is common.'], 'description': [CALL_US]}),
+            ('family law', FAMILY_LAW, 'practice areas', {'description': [CALL_US]}),
+            ('home', 'https://stolmeierlaw.com/', None, {'description': [CALL_US]}),
+        ])
+        results = search_content(['speeding'], limit=3)
+        self.assertEqual([(url, title) for url, title, _, _ in results], [(CAR_ACCIDENTS, 'car accidents')])
+        self.assertIn('«Speeding»', results[0][3])
+
+        results = search_content(['consultation'], limit=3)
+        self.assertEqual(len(results), 1)
+        self.assertIn('«consultation»', results[0][3])
+
+    def test_outdated_triggers_are_replaced_and_the_index_rebuilt(self):
+        store_pages([('home', 'https://stolmeierlaw.com/', None, {'description': [CALL_US], 'p': [SPEEDING]})])
+        with transaction() as conn:
+            # An older definition that indexed every tag, and an index it left stale
+            conn.execute("DROP TRIGGER website_content_search_insert")
+            conn.execute("""CREATE TRIGGER website_content_search_insert AFTER INSERT ON website_content BEGIN
+                INSERT INTO search_index (rowid, content, page_title, parent_page, url, tag)
+                VALUES (new.rowid * 2, new.content, new.page_title, NULL, new.url, new.tag);
+            END""")
+            conn.execute("DELETE FROM search_index")
+            conn.execute("INSERT INTO search_index (rowid, content, page_title, url, tag) "
+                         "VALUES (1000, 'stale', 'gone', 'https://gone/', 'p')")
+
+        init_db()
+        with connection() as conn:
+            self.assertEqual({sql for _, sql in conn.execute(database.SELECT_SEARCH_TRIGGERS_SQL)},
+                             set(SEARCH_TRIGGERS_SQL))
+        self.assertEqual(self.indexed(), [('home', 'description', CALL_US)])
+
+
+if __name__ == '__main__':
+    unittest.main()
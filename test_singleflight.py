@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest
+
+from singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    def run_concurrently(self, flights, key, fn, callers=5):
+        """Call flights.do(key, fn) from several threads; returns their results (or exceptions)."""
+        results = [None] * callers
+        threads = []
+
+        def call(position):
+            try:
+                results[position] = flights.do(key, fn)
+            except Exception as e:
+                results[position] = e
+
+        for position in range(callers):
+            thread = threading.Thread(target=call, args=(position,))
+            thread.start()
+            threads.append(thread)
+        return threads, results
+
+    def wait_for_waiters(self, flights, count):
+        """Block until ``count`` callers joined the in-flight call."""
+        deadline = time.monotonic() + 5
+        while flights.stats()['deduplicated'] < count:
+            self.assertLess(time.monotonic(), deadline, 'callers never joined the flight')
+            time.sleep(0.001)
+
+    def test_concurrent_callers_share_one_execution(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        executions = []
+
+        def fetch():
+            executions.append(1)
+            release.wait(5)
+            return object()
+
+        threads, results = self.run_concurrently(flights, 'url', fetch)
+        self.wait_for_waiters(flights, 4)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(executions), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(flights.stats(), {'executions': 1, 'deduplicated': 4, 'in_flight': 0})
+
+    def test_concurrent_callers_share_the_error(self):
+        flights = SingleFlight()
+        release = threading.Event()
+        error = RuntimeError('fetch failed')
+
+        def fetch():
+            release.wait(5)
+            raise error
+
+        threads, results = self.run_concurrently(flights, 'url', fetch, callers=3)
+        self.wait_for_waiters(flights, 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [error] * 3)
+        self.assertEqual(flights.stats()['in_flight'], 0)
+
+    def test_different_keys_and_later_calls_run_again(self):
+        flights = SingleFlight()
+        self.assertEqual(flights.do(('url', 'auto', True), lambda: 1), 1)
+        self.assertEqual(flights.do(('url', 'auto', False), lambda: 2), 2)
+        self.assertEqual(flights.do(('url', 'auto', True), lambda: 3), 3)
+        self.assertEqual(flights.stats(), {'executions': 3, 'deduplicated': 0, 'in_flight': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()